@@ -1,6 +1,9 @@
+import numpy as np
 import statsmodels.stats.proportion as prop
 import matplotlib.pyplot as plt
 
+from Reused import binomial_batch
+
 
 deck_info = {'Boba': {"Wins": 198, "Loss": 128, "Tie": 0},
              'Sabine': {"Wins": 101, "Loss": 112, "Tie": 0},
@@ -51,6 +54,27 @@ def do_binom_test(deck: dict) -> float:
     return prob
 
 
+def calc_deck_stats(decks: dict, alpha=.05, method='holm') -> dict:
+    """
+    calc_binom_limit and do_binom_test for every deck in one go, plus a correction for testing lots of decks at once
+    (with enough decks, one of them looks like it's not a coinflip by luck alone). See Reused/binomial_batch.py
+    :param decks: a dict of dicts of the form {"deckname" : {"Wins": X, "Loss": Y, "Tie": Z}, "deckname2": ...}
+    :param alpha: the significance level
+    :param method: the multiple comparison correction, 'holm', 'bonferroni', 'fdr_bh' or anything multipletests takes
+    :return: decks, with the 'base_region' and 'exp_region' from calc_binom_limit, the 'p_value' from do_binom_test,
+    the 'corrected' p-value and whether we 'reject' the coinflip added to each deck
+    """
+    wins = np.array([decks[deck]['Wins'] for deck in decks])
+    ngames = np.array([calc_ngames(decks[deck]) for deck in decks])
+    results = binomial_batch.binom_tests(wins, ngames, alpha, method)
+    for i, deck in enumerate(decks):
+        decks[deck]['base_region'] = (int(results['base_low'][i]), int(results['base_high'][i]))
+        decks[deck]['exp_region'] = (int(results['exp_low'][i]), int(results['exp_high'][i]))
+        for k in ['p_value', 'corrected', 'reject']:
+            decks[deck][k] = results[k][i]
+    return decks
+
+
 def plot_decks(decks):
     """
     Make a plot of the expected wins based on observed performance vs. hypothetical coin-flip performance
@@ -80,9 +104,8 @@ def plot_decks(decks):
 
 if __name__ == "__main__":
     # actually run the calculations
+    calc_deck_stats(deck_info)
     for deck in deck_info:
-        base_region, exp_region = calc_binom_limit(deck_info[deck])
-        deck_info[deck]['base_region'] = base_region
-        deck_info[deck]['exp_region'] = exp_region
-        print(f"{deck}: chance results could come from a coinflip - {do_binom_test(deck_info[deck]):.1%}")
+        print(f"{deck}: chance results could come from a coinflip - {deck_info[deck]['p_value']:.1%} "
+              f"({deck_info[deck]['corrected']:.1%} corrected for testing {len(deck_info)} decks)")
     plot_decks(deck_info)
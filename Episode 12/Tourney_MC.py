@@ -1,6 +1,9 @@
+import os
 import random
 import matplotlib.pyplot as plt
-from Binomial_Calculator import calc_binom_limit, do_binom_test
+import numpy as np
+from Binomial_Calculator import calc_deck_stats
+from Reused import streaming_stats, swiss_event, swiss_exact, swiss_sim
 
 deck_edges = {'En Vogue': .1}
 n_rounds = 8
@@ -11,7 +14,19 @@ n_decks = {'En Vogue': 43,
            "Boyz II Men": 20,
            "Bell Biv DeVoe": 7,
            "Color Me Badd": 5,
-           "PM Dawn": 3}  # must always have an even total. I don't handle byes in this code
+           "PM Dawn": 3}  # must always have an even total outside of 'large' mode, only that handles byes
+N_TOURNEYS = 10000  # tournaments to play in batch mode, one tournament on its own is just an anecdote
+# game win rates for every pair of decks, with the deck names across the top and down the side. Batch mode uses it
+# instead of deck_edges when there's anything in it
+MATCHUP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'matchup_matrix.csv')
+CUT_SIZE = 8  # players who make the top cut
+# 'batch' plays N_TOURNEYS tournaments at once, 'single' plays one with Player objects and runs the Binomial Calculator
+# on it, and 'large' plays N_EVENTS championship sized events (LARGE_FIELD players with the same deck shares) with
+# byes, drops, intentional draws and a top cut
+MODE = 'batch'
+LARGE_FIELD = 10000
+LARGE_ROUNDS = 9
+N_EVENTS = 200
 
 
 class Player:  # this Player class is kinda bare-bones, but we can expand it in the future
@@ -194,13 +209,6 @@ def make_deck_info(players: list) -> dict:
                 decks[player.deck][k] += player.record[k]
 
     return decks
-    
-
-players = make_players(n_decks)
-for i in range(n_rounds):
-    play_round(players)
-
-fake_deck_info = make_deck_info(players)  # make the fake deck info
 
 
 def plot_decks(decks):
@@ -239,10 +247,96 @@ def plot_decks(decks):
         plt.show()
 
 
-for deck in fake_deck_info:
-    base_region, exp_region = calc_binom_limit(fake_deck_info[deck])
-    fake_deck_info[deck]['base_region'] = base_region
-    fake_deck_info[deck]['exp_region'] = exp_region
-    print(f"{deck}: chance results could come from a coinflip - {do_binom_test(fake_deck_info[deck]):.1%}")
+def plot_win_distributions(names, histograms):
+    """
+    plot how many wins a player on each deck ends up with, over every tournament in a batch
+    :param names: a list of deck names
+    :param histograms: an (n decks x rounds + 1) array from swiss_sim.win_histograms
+    :return: None, just plots
+    """
+    with plt.xkcd():
+        plt.clf()
+        wins = range(histograms.shape[1])
+        for name, histogram in zip(names, histograms):
+            plt.step(wins, histogram, where='mid', label=name)
+        plt.legend()
+        plt.xlabel("Number of Wins")
+        plt.ylabel("Share of the deck's players")
+        plt.show()
+
+
+def run_batch():
+    """
+    play N_TOURNEYS tournaments at once and look at the spread of results for every deck
+    """
+    if os.path.getsize(MATCHUP_FILE):
+        matchups = swiss_sim.load_matchup_matrix(MATCHUP_FILE, list(n_decks))
+    else:
+        matchups = deck_edges
+    results = swiss_sim.stream_tournaments(n_decks, matchups, n_rounds, N_TOURNEYS, cut_size=CUT_SIZE)
+    histograms = results['histograms']
+    top_cut = results['top_cut']
+    # the same tournament worked out analytically, as a check on the simulation. With edges or a matchup matrix it's a
+    # mean-field approximation, so it can differ from the simulation by more than the noise
+    solution = swiss_exact.solve_tournament(n_decks, matchups, n_rounds)
+    analytic_histograms = swiss_exact.win_histograms(solution)
+    analytic_top_cut = swiss_exact.top_cut_odds(solution, CUT_SIZE)
+    all_wins = np.arange(n_rounds + 1)
+    for deck, name in enumerate(results['names']):
+        win_rates = results['win_rates'][deck]
+        low, high = streaming_stats.quantiles(win_rates, [.05, .95])
+        average, analytic_average = histograms[deck] @ all_wins, analytic_histograms[deck] @ all_wins
+        print(f"{name}: {average:.2f} wins on average (analytic {analytic_average:.2f}), match win rate "
+              f"{win_rates['mean']:.1%} (90% of tournaments {low:.1%}-{high:.1%}), "
+              f"{histograms[deck, -1]:.2%} of players go undefeated, {top_cut[deck]:.2%} make the top {CUT_SIZE} "
+              f"(analytic {analytic_top_cut[deck]:.2%}), results differ from a coinflip in "
+              f"{results['flagged'][deck]:.1%} of tournaments")
+    plot_win_distributions(results['names'], histograms)
+
+
+def run_single():
+    """
+    play one tournament with Player objects and check each deck's results against a coinflip
+    """
+    players = make_players(n_decks)
+    for i in range(n_rounds):
+        play_round(players)
+
+    fake_deck_info = make_deck_info(players)  # make the fake deck info
+    calc_deck_stats(fake_deck_info)
+    for deck in fake_deck_info:
+        print(f"{deck}: chance results could come from a coinflip - {fake_deck_info[deck]['p_value']:.1%} "
+              f"({fake_deck_info[deck]['corrected']:.1%} corrected)")
+
+    plot_decks(fake_deck_info)
+
+
+def run_large_field():
+    """
+    play N_EVENTS big events and see how often each deck makes the cut and wins
+    """
+    total = sum(n_decks.values())
+    field = {deck: round(n_decks[deck] * LARGE_FIELD / total) for deck in n_decks}
+    matchups = swiss_sim.load_matchup_matrix(MATCHUP_FILE, list(n_decks)) if os.path.getsize(MATCHUP_FILE) \
+        else deck_edges
+    results = swiss_event.run_events(field, matchups, LARGE_ROUNDS, N_EVENTS, n_workers=os.cpu_count(),
+                                     cut_size=CUT_SIZE)
+    print(f"{sum(field.values())} players, {LARGE_ROUNDS} rounds, {N_EVENTS} events")
+    for deck, name in enumerate(results['names']):
+        print(f"{name}: {results['counts'][deck] / sum(field.values()):.1%} of the field, "
+              f"{results['top_cut'][deck] / (CUT_SIZE * N_EVENTS):.1%} of the top {CUT_SIZE}, "
+              f"won {results['winners'][deck] / N_EVENTS:.1%} of events")
+    cut_line = streaming_stats.summary(results['cut_line'], (.05, .95))
+    dropped = streaming_stats.summary(results['dropped'], (.5,))
+    print(f"the last player into the cut had {cut_line['mean']:.1f} points on average "
+          f"(90% of events {cut_line['q0.05']:.0f}-{cut_line['q0.95']:.0f}), {dropped['mean']:.0f} players dropped")
+
+
+if __name__ == "__main__":
+    if MODE == 'large':
+        run_large_field()
+    elif MODE == 'single':
+        run_single()
+    else:
+        run_batch()
 
-plot_decks(fake_deck_info)
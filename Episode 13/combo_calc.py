@@ -1,5 +1,4 @@
-import matplotlib.pyplot as plt
-from scipy.stats import hypergeom
+from Reused.combo_odds import combo_odds
 
 STARTING_DECK_SIZE = 50
 CARD_COUNTS = {'A': 3, 'B': 3, 'C': 3}
@@ -17,29 +16,19 @@ def calc_n_draws(card_cost) -> int:
     return cards_drawn
 
 
-def get_draw_odds(combo_cost, n_copies) -> float:
-    """
-    get the hypergeometric odds of drawing at least one copy of a card
-    :param combo_cost: the cost of the combo
-    :param n_copies: the number of copies of the card in the deck
-    :return: the hypergeometric odds of drawing at least one of the copies of the card
-    """
-    draws = calc_n_draws(combo_cost)
-    prob_miss = hypergeom.cdf(0, STARTING_DECK_SIZE, n_copies, draws)
-    prob_hit = 1-prob_miss
-    return prob_hit
-
-
-total_prob = 1
-for card in CARD_COUNTS:
-    # we're going to do a simplification, and assuming that the odds of drawing all parts of the
-    # combo are independent, so the odds are just prob1 * prob2 * ..... probN
-    card_prob = get_draw_odds(COMBO_COST, CARD_COUNTS[card])
-    total_prob = total_prob * card_prob
-
-print("Probability of Drawing all parts of an N-Card Combo by execution turn without mulligans")
-print(f"N_Cards in combo: {len(CARD_COUNTS)}")
-print(f"Combo Cost : {COMBO_COST}")
-for card in CARD_COUNTS:
-    print(f'Copies of card "{card}": {CARD_COUNTS[card]}')
-print(f"Total Probability: {total_prob}")
+if __name__ == "__main__":
+    copies = list(CARD_COUNTS.values())
+    needed = [1] * len(CARD_COUNTS)  # at least 1 copy of each piece
+    draws = calc_n_draws(COMBO_COST)
+    # exact, the pieces aren't independent: seeing one piece takes up a card that could have been another
+    total_prob = combo_odds(copies, needed, STARTING_DECK_SIZE, draws)
+
+    print("Probability of Drawing all parts of an N-Card Combo by execution turn without mulligans")
+    print(f"N_Cards in combo: {len(CARD_COUNTS)}")
+    print(f"Combo Cost : {COMBO_COST}")
+    for card in CARD_COUNTS:
+        print(f'Copies of card "{card}": {CARD_COUNTS[card]}')
+    print(f"Total Probability: {total_prob}")
+    for hold in range(len(CARD_COUNTS) + 1):
+        mulligan_prob = combo_odds(copies, needed, STARTING_DECK_SIZE, draws, threshold=hold)
+        print(f"With a mulligan at a Threshold of {hold}: {mulligan_prob}")
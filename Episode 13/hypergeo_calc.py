@@ -1,5 +1,8 @@
 import matplotlib.pyplot as plt
-from scipy.stats import hypergeom
+import numpy as np
+
+from Reused import hypergeo_grid
+from Reused.threshold_finder import bisect_min
 
 # we're using this to calculate the number of 2-cost units you need in your deck, assuming
 # 1) you always want a turn-1 play and
@@ -29,7 +32,7 @@ def get_draw_odds(card_cost, n_copies) -> float:
     :return: the hypergeometric odds of drawing at least one of the copies of the card
     """
     draws = calc_n_draws(card_cost)
-    prob_miss = hypergeom.cdf(0, STARTING_DECK_SIZE, n_copies, draws)
+    prob_miss = hypergeo_grid.cdf(0, STARTING_DECK_SIZE, n_copies, draws)
     return prob_miss
 
 
@@ -54,12 +57,12 @@ def make_plot(results) -> None:
     plt.show()
 
 
-success_rate = []
-for copies in range(1, 30):
-    hit_rate = 1-(get_draw_odds(UNIT_COST, copies)**2)
+if __name__ == "__main__":
+    copy_range = np.arange(1, 30)
     # need to miss on both initial hand and mulligan, so we want to calculate the odds of missing twice and taking
     # the conjugate probability
-    success_rate.append(hit_rate)
-    if hit_rate > .95:  # we're assuming we want a 95% or greater hit rate
-        print(f"copies: {copies}, {hit_rate}")
-make_plot(success_rate)
+    success_rate = 1-(get_draw_odds(UNIT_COST, copy_range)**2)
+    # we're assuming we want a 95% or greater hit rate. More copies only helps, so we can bisect for the first one
+    copies, n_evaluations = bisect_min(lambda n_copies: 1-(get_draw_odds(UNIT_COST, n_copies)**2), .95, 1, 29)
+    print(f"copies: {copies}, {success_rate[copies - 1]} ({n_evaluations} evaluations)")
+    make_plot(success_rate)
@@ -1,7 +1,140 @@
+import math
 import random
+import time
 import matplotlib.pyplot as plt
+import numpy as np
 
+from Reused import hypergeo_grid
+
+# the goal of this script is to find the curve (how many cards of each cost) that gives the most on-curve plays,
+# scored the same way as deck_odds_calc.py: on turn N we want an N+1 cost play, and we've seen 6+2*(N-1) cards.
+# The score is separable by cost, so we work out the value of every (cost, copies) pair up front and a move of one
+# card from one cost to another is rescored from 4 table lookups, so the annealing tries hundreds of thousands of
+# curves a second
 
 starting_deck_size = [60, 50,45]
+TURNS = range(1, 9)  # turns 1-8
+MAX_COST = max(TURNS) + 1
+N_STEPS = 200000  # candidate curves to try per deck size
+START_TEMP = .05  # how big a loss in score the annealing will take early on, it cools to 0 by the end
+
+
+def cards_seen(turn) -> int:
+    return 6 + 2 * (turn - 1)
+
+
+def make_value_table(deck_size, turn_weights=None) -> np.ndarray:
+    """
+    the exact value of every number of copies at every cost, all in one grid call
+    :param deck_size: cards in the deck
+    :param turn_weights: how much an on-curve play is worth on each turn in TURNS, all 1 by default
+    :return: an (MAX_COST + 1, deck_size + 1) array, entry [cost, copies] is the weighted chance of an on-curve play
+    on the turn that cost is for
+    """
+    turns = np.array(TURNS)
+    weights = np.ones(len(turns)) if turn_weights is None else np.asarray(turn_weights, dtype=float)
+    copies = np.arange(deck_size + 1)
+    table = np.zeros((MAX_COST + 1, deck_size + 1))
+    table[turns + 1] = weights[:, None] * (1 - hypergeo_grid.cdf(0, deck_size, copies, cards_seen(turns)[:, None]))
+    return table
+
+
+def score(curve, table) -> float:
+    """
+    :param curve: a list of how many cards we have at each cost, from 0 up to MAX_COST
+    :param table: a value table from make_value_table
+    :return: the expected number of on-curve plays (weighted, if the table is)
+    """
+    return sum(table[cost][copies] for cost, copies in enumerate(curve))
+
+
+def anneal(deck_size, table, n_steps=N_STEPS, start_temp=START_TEMP, curve=None, lower=None, upper=None) -> tuple:
+    """
+    simulated annealing over curves, each step moves one card from one cost to another
+    :param deck_size: cards in the deck, every curve sums to this
+    :param table: a value table from make_value_table
+    :param n_steps: how many moves to try
+    :param start_temp: the starting temperature, it drops linearly to 0
+    :param curve: the curve to start from, a flat curve over the turns we score by default
+    :param lower: the fewest cards we'll allow at each cost, 0 by default
+    :param upper: the most cards we'll allow at each cost, no limit by default
+    :return: (the best curve, its score)
+    """
+    lower = [0] * (MAX_COST + 1) if lower is None else lower
+    upper = [deck_size] * (MAX_COST + 1) if upper is None else upper
+    if curve is None:
+        curve = list(lower)
+        for i in range(deck_size - sum(lower)):  # deal the rest out evenly over the costs we score
+            curve[2 + i % (MAX_COST - 1)] += 1
+    curve = list(curve)
+    values = table.tolist()  # plain lists are a lot quicker to index one entry at a time
+    current = best_score = score(curve, table)
+    best = list(curve)
+    costs = range(MAX_COST + 1)
+    for step in range(n_steps):
+        temp = start_temp * (1 - step / n_steps)
+        give, take = random.sample(costs, 2)  # move a card from give to take
+        if curve[give] <= lower[give] or curve[take] >= upper[take]:
+            continue
+        # only the two costs we touched change
+        delta = (values[give][curve[give] - 1] - values[give][curve[give]]
+                 + values[take][curve[take] + 1] - values[take][curve[take]])
+        if delta >= 0 or (temp > 0 and random.random() < math.exp(delta / temp)):
+            curve[give] -= 1
+            curve[take] += 1
+            current += delta
+            if current > best_score:
+                best_score = current
+                best = list(curve)
+    return best, score(best, table)
+
+
+def greedy_curve(deck_size, table, lower=None, upper=None) -> tuple:
+    """
+    add cards one at a time wherever they're worth the most. Every cost's value only goes up by less with each extra
+    copy, so for this score that's the true best curve, and a check on anneal
+    :return: (the curve, its score)
+    """
+    lower = [0] * (MAX_COST + 1) if lower is None else lower
+    upper = [deck_size] * (MAX_COST + 1) if upper is None else upper
+    curve = list(lower)
+    for _ in range(deck_size - sum(lower)):
+        gains = [table[cost][copies + 1] - table[cost][copies] if copies < upper[cost] else -np.inf
+                 for cost, copies in enumerate(curve)]
+        curve[int(np.argmax(gains))] += 1
+    return curve, score(curve, table)
+
+
+def make_plot(curves, tables):
+    with plt.xkcd():
+        fig = plt.figure()
+        ax = fig.add_axes((0.1, 0.2, 0.8, 0.7))
+        ax.spines[['top', 'right']].set_visible(False)
+        ax.set_ylim([0, 1])
+        ax.set_xlabel("turn_number")
+        ax.set_ylabel("Prob of having a N+1-cost play on turn N")
+
+    for label in curves:
+        x = list(TURNS)
+        y = [tables[label][turn + 1][curves[label][turn + 1]] for turn in TURNS]
+        ax.plot(x, y, label=label)
+    ax.legend()
+    plt.show()
 
 
+if __name__ == "__main__":
+    best_curves = {}
+    value_tables = {}
+    for deck_size in starting_deck_size:
+        label = f'Decksize : {deck_size} '
+        table = make_value_table(deck_size)
+        start = time.time()
+        curve, curve_score = anneal(deck_size, table)
+        elapsed = time.time() - start
+        greedy, greedy_score = greedy_curve(deck_size, table)
+        print(f"{label} - best curve: {dict(enumerate(curve))}")
+        print(f"{curve_score:.4f} expected on-curve plays over turns 1-{max(TURNS)} (greedy check: {greedy_score:.4f}),"
+              f" {N_STEPS / elapsed:,.0f} curves a second")
+        best_curves[label] = curve
+        value_tables[label] = table
+    make_plot(best_curves, value_tables)
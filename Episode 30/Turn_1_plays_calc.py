@@ -1,6 +1,8 @@
-import random
 import matplotlib.pyplot as plt
-from scipy.stats import hypergeom
+import numpy as np
+
+from Reused import hypergeo_grid
+from Reused.threshold_finder import bisect_grid
 
 DECKSIZES = [60, 50,45]
 turn_1_plays = [i for i in range(1,20)]
@@ -10,16 +12,15 @@ turn_1_plays = [i for i in range(1,20)]
 prob_hit = {}
 min_count = {}
 seen_cards = 6
-for decksize in DECKSIZES:
+# every deck size and card count in one go, a row per deck size
+prob_miss = hypergeo_grid.cdf(0, np.array(DECKSIZES)[:, None], np.array(turn_1_plays), seen_cards)**2
+# the odds only go up with the card count, so bisect for the first count over 95%, every deck size at once
+first_over = bisect_grid(lambda card_count: 1-hypergeo_grid.cdf(0, np.array(DECKSIZES), card_count, seen_cards)**2,
+                         .95, min(turn_1_plays), max(turn_1_plays))
+for decksize, row, first in zip(DECKSIZES, 1-prob_miss, first_over):
     label = f'Decksize : {decksize} '
-    prob_hit[label] = []
-    min_count[label] = max(turn_1_plays)
-    for card_count in turn_1_plays:
-        hypergeo = hypergeom(decksize,card_count, seen_cards)
-        prob_miss = hypergeom.cdf(0, decksize, card_count, seen_cards)**2
-        prob_hit[label].append(1-prob_miss)
-        if (1-prob_miss> .95) and (min_count[label]>card_count):
-            min_count[label] = card_count
+    prob_hit[label] = list(row)
+    min_count[label] = min(int(first), max(turn_1_plays))
 
 for label in min_count:
     print(f"{label} - optimal 1st turn plays: {min_count[label]}")
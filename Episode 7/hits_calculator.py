@@ -1,11 +1,15 @@
 import matplotlib.pyplot as plt
-from scipy.stats import hypergeom
-import math
+import numpy as np
 import random
 
+from Reused import hypergeo_grid
+from Reused.threshold_finder import bisect_grid
+
 STARTING_DECK_SIZE = 50
 MAX_HITS = 25
 N_TRIALS = 10000
+VADER_LOOKS = 10  # Vader looks at the top 10 cards
+CHECK_WITH_MC = False  # set to True to check the exact Vader odds against N_TRIALS of the Monte Carlo
 
 n_draws = {'Recruit / Mon Mothma': 5, 'Takeoff': 8, 'Vader for 3s': 10, 'Vader for 1s': 10, 'Tarkin': 5, 'Jabba': 8}
 n_keeps = {'Recruit / Mon Mothma': 1, 'Takeoff': 2, 'Vader for 3s': 1, 'Vader for 1s': 3, 'Tarkin': 2, 'Jabba': 1}
@@ -18,19 +22,26 @@ def calc_deck_size(card_cost):
     return STARTING_DECK_SIZE - cards_drawn
 
 
-results = {}
-break_point = {}
-for key in n_draws.keys():
-    break_point[key] = MAX_HITS
-    results[key] = []
-    deck_size = calc_deck_size(cost[key])
+keys = list(n_draws.keys())
+deck_sizes = np.array([calc_deck_size(cost[key]) for key in keys])
+keeps = np.array([n_keeps[key] for key in keys])
+draws = np.array([n_draws[key] for key in keys])
+
+
+def hit_odds(n_hits):
+    """
+    the odds of maximal value for every card in keys at once
+    :param n_hits: the number of hits in the deck, a number or an array that broadcasts against keys
+    """
+    n_actual_hits = np.floor(deck_sizes/STARTING_DECK_SIZE*n_hits).astype(int)
+    return 1 - hypergeo_grid.cdf(keeps - 1, deck_sizes, n_actual_hits, draws)
 
-    for n_hits in range(0, MAX_HITS):
-        n_actual_hits = math.floor(deck_size/STARTING_DECK_SIZE*n_hits)
-        prob = hypergeom.cdf(n_keeps[key] - 1, deck_size, n_actual_hits, n_draws[key])
-        if prob < .05 and n_hits < break_point[key]:
-            break_point[key] = n_hits
-        results[key].append(1-prob)
+
+# every hit count for every card at once, a column per hit count
+odds = hit_odds(np.arange(0, MAX_HITS)[:, None]).T
+results = {key: list(row) for key, row in zip(keys, odds)}
+# more hits never hurts, so bisect for the first hit count over 95%, MAX_HITS if we never get there
+break_point = {key: int(first) for key, first in zip(keys, bisect_grid(hit_odds, .95, 0, MAX_HITS - 1))}
 
 
 def make_plot(hyper_results):
@@ -72,52 +83,88 @@ def calc_low_cost(N_low):
     return ones, twos, threes
 
 
-def make_vader_deck(ones, twos, threes):
-    deck = []
+def make_vader_deck(ones, twos, threes) -> bytearray:
+    """
+    the deck as a code per card, its cost if it's a 1, 2 or 3 and 0 otherwise. We make it once per deck and deal every
+    trial from it, see draw_sample
+    """
     free_cards = STARTING_DECK_SIZE - (ones + twos + threes)
-    deck += [1] * ones
-    deck += [2] * twos
-    deck += [3] * threes
-    deck += [0] * free_cards
-    random.shuffle(deck)
+    deck = bytearray([1] * ones + [2] * twos + [3] * threes + [0] * free_cards)
     assert len(deck) == STARTING_DECK_SIZE
-    deck_size = calc_deck_size(7)
-    return deck[:deck_size]
+    return deck
+
+
+def draw_sample(deck, sample, n_cards):
+    """
+    deal n_cards off a fresh shuffle into sample, a count of each cost, in place. We only shuffle as far as we deal,
+    by swapping a random card from further down into each slot. By Vader's turn we've drawn calc_deck_size(7) cards,
+    but what's left is still a random part of the deck, so 10 off the top of it is 10 random cards from the whole deck
+    """
+    for cost in range(len(sample)):
+        sample[cost] = 0
+    for cursor in range(n_cards):
+        swap = cursor + int(random.random() * (len(deck) - cursor))
+        deck[cursor], deck[swap] = deck[swap], deck[cursor]
+        sample[deck[cursor]] += 1
 
 
 def check_results(sample):
-    if 3 in sample:
+    """
+    :param sample: how many 0s, 1s, 2s and 3s we looked at
+    """
+    if sample[3]:
         return 1
-    if (2 in sample) and (1 in sample):
+    if sample[2] and sample[1]:
         return 1
-    if (sum(sample) % 2) and (sum(sample) > 1):  # odd sum but no 3 and no 2 and 1 -> odd number of 1's
+    total = sample[1] + 2 * sample[2]
+    if (total % 2) and (total > 1):  # odd sum but no 3 and no 2 and 1 -> odd number of 1's
         return 1
     else:
         return 0
 
 
+def exact_vader_calc(low_counts=range(0, MAX_HITS)):
+    """
+    the exact odds for check_results, with no trials. The window is 10 random cards from the deck, so the chance of
+    seeing a 1s, b 2s and c 3s in it is multivariate hypergeometric, and we add that up over every (a, b, c) that
+    gets maximal value. Every deck in low_counts is done at once, as a (deck, a, b, c) grid
+    :param low_counts: the N_low values to work out
+    :return: a list of the odds, one per N_low
+    """
+    ones, twos, threes = np.array([calc_low_cost(N_low) for N_low in low_counts]).T[:, :, None, None, None]
+    seen = np.arange(VADER_LOOKS + 1)
+    a, b, c = seen[:, None, None], seen[None, :, None], seen[None, None, :]
+    free_cards = STARTING_DECK_SIZE - (ones + twos + threes)
+    log_odds = (hypergeo_grid.log_comb(ones, a) + hypergeo_grid.log_comb(twos, b) + hypergeo_grid.log_comb(threes, c)
+                + hypergeo_grid.log_comb(free_cards, VADER_LOOKS - a - b - c)
+                - hypergeo_grid.log_comb(STARTING_DECK_SIZE, VADER_LOOKS))
+    total = a + 2 * b
+    # same as check_results: a 3, or a 2 and a 1, or an odd total over 1
+    max_value = (c > 0) | ((b > 0) & (a > 0)) | ((total % 2 == 1) & (total > 1))
+    return np.where(max_value, np.exp(log_odds), 0).sum(axis=(1, 2, 3)).tolist()
+
+
 def full_vader_calc():
     hits = []
+    sample = [0] * 4
     for N_low in range(0,MAX_HITS):
         ones, twos, threes = calc_low_cost(N_low)
         hits.append(0)
+        deck = make_vader_deck(ones, twos, threes)
         for i in range(N_TRIALS):
-            deck = make_vader_deck(ones, twos, threes)
-            random.shuffle(deck)
-            sample = deck[0:10].copy()
+            draw_sample(deck, sample, 10)
             hits[N_low] += check_results(sample)
     results = [i / N_TRIALS for i in hits]
     return results
 
 
-hits = full_vader_calc()
+hits = exact_vader_calc()
 print(hits)
-v_break = MAX_HITS
-for i in range(len(hits)):
-    if hits[i] > .95 and i < v_break:
-        v_break = i
-
-break_point['Realistic Vader'] = v_break
+if CHECK_WITH_MC:
+    mc_hits = full_vader_calc()
+    print(f"biggest gap to the Monte Carlo: {max(abs(np.array(hits) - mc_hits)):.4f}")
+# the whole curve is already in hits, so bisect on that like the other break points
+break_point['Realistic Vader'] = int(bisect_grid(lambda N_low: np.asarray(hits)[N_low], .95, 0, MAX_HITS - 1))
 results['Realistic Vader'] = hits
 
 print(break_point)
@@ -0,0 +1,206 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+import numpy as np
+from statsmodels.stats.proportion import proportion_confint
+
+from Reused.batch_combo_calc import combo_spec, N_TRIALS
+from Reused.draw_engine import hits_by_cost, info_spec
+from Reused.parallel_runner import chunk_sizes, make_seed, run_chunks
+
+# adaptive versions of the Monte Carlo runs. Rather than always running N_TRIALS, we run chunks of trials until the
+# confidence interval on the hit rate is as narrow as we asked for, or until the best mulligan threshold is clearly
+# better than all the others (with alpha spread over every look we might take, not just the last one). Chunks use the
+# same seeds as parallel_runner, so an adaptive run with a fixed seed is just the first few chunks of the matching
+# fixed-size run, and the stopping point doesn't depend on n_workers
+
+ALPHA = .05  # 95% intervals
+METHOD = 'wilson'  # or 'beta' for Clopper-Pearson
+TARGET_WIDTH = .01  # stop once the interval is 1 percentage point wide
+MAX_TRIALS = 10 * N_TRIALS  # but never run more than this many trials for one estimate
+
+
+def make_estimate(successes, n_trials, alpha=ALPHA, method=METHOD) -> dict:
+    """
+    turn a success count into an estimate with a confidence interval
+    :param successes: how many trials hit
+    :param n_trials: how many trials we ran
+    :param alpha: 1 - the confidence level of the interval
+    :param method: any statsmodels proportion_confint method, 'wilson' or 'beta' (Clopper-Pearson) are the sensible ones
+    :return: a dict of the form {'successes': X, 'trials': N, 'rate': X/N, 'interval': (low, high)}
+    """
+    low, high = proportion_confint(successes, n_trials, alpha=alpha, method=method)
+    return {'successes': successes, 'trials': n_trials, 'rate': successes / n_trials, 'interval': (low, high)}
+
+
+def make_pool(n_workers, executor=None):
+    """
+    a context manager for the pool an adaptive run should use, so we only start the processes once per run
+    :param n_workers: how many processes to use
+    :param executor: an already running ProcessPoolExecutor, which we use and leave running
+    :return: a ProcessPoolExecutor to use as a context manager, or a nullcontext holding executor
+    """
+    if executor is None and n_workers > 1:
+        return ProcessPoolExecutor(max_workers=n_workers)
+    return nullcontext(executor)
+
+
+def interval_width(estimate) -> float:
+    return estimate['interval'][1] - estimate['interval'][0]
+
+
+def describe(estimate) -> str:
+    low, high = estimate['interval']
+    return f"{estimate['rate']:.2%} [{low:.2%}, {high:.2%}] after {estimate['trials']} trials"
+
+
+def run_curve(spec, combo_cost, target_width=TARGET_WIDTH, seed=None, max_trials=MAX_TRIALS, alpha=ALPHA,
+              method=METHOD, n_workers=1, executor=None, whole_curve=True) -> list:
+    """
+    run chunks of the batch draw engine until the interval on the hit rate by every resource up to combo_cost is at
+    most target_width wide (or just the interval at combo_cost, if whole_curve is False)
+    :param spec: a deck spec, see draw_engine.make_spec
+    :param combo_cost: the furthest resource we play up to
+    :param target_width: how wide the intervals can be before we stop
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param max_trials: give up and report what we have after this many trials
+    :param alpha: 1 - the confidence level of the intervals
+    :param method: the proportion_confint method
+    :param n_workers: how many chunks to run at once
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :param whole_curve: do we need every resource narrow, or only combo_cost?
+    :return: a list of estimate dicts (see make_estimate), for hitting by resource 2, 3, ... up to combo_cost
+    """
+    seed = make_seed(seed)
+    sizes = chunk_sizes(max_trials)
+    histogram = 0
+    n_trials = 0
+    estimates = None
+    with make_pool(n_workers, executor) as pool:
+        for start in range(0, len(sizes), n_workers):
+            jobs = [(make_seed(seed, i), sizes[i], spec, combo_cost)
+                    for i in range(start, min(start + n_workers, len(sizes)))]
+            # we check the stopping rule after every chunk, in order, and throw away anything run past the stopping
+            # point. That way the answer is the same however many chunks we ran at once
+            for job, chunk_histogram in zip(jobs, run_chunks(jobs, n_workers, pool)):
+                histogram = histogram + chunk_histogram
+                n_trials += job[1]
+                estimates = [make_estimate(int(hits), n_trials, alpha, method) for hits in hits_by_cost(histogram)]
+                checked = estimates if whole_curve else estimates[-1:]
+                if max(interval_width(estimate) for estimate in checked) <= target_width:
+                    return estimates
+    return estimates
+
+
+def count_successes(card_counts, threshold, combo_cost, target_width=TARGET_WIDTH, seed=None, max_trials=MAX_TRIALS,
+                    alpha=ALPHA, method=METHOD, n_workers=1, executor=None, **deck_kwargs) -> dict:
+    """
+    run chunks of the batch combo engine until the interval on the hit rate is at most target_width wide,
+    see run_curve for the parameters
+    :return: an estimate dict, see make_estimate
+    """
+    spec = combo_spec(card_counts, threshold, **deck_kwargs)
+    return run_curve(spec, combo_cost, target_width, seed, max_trials, alpha, method, n_workers, executor,
+                     whole_curve=False)[-1]
+
+
+def calc_odds(deck_info, n_cards, resources, target_width=TARGET_WIDTH, seed=None, max_trials=MAX_TRIALS,
+              alpha=ALPHA, method=METHOD, n_workers=1, executor=None) -> dict:
+    """
+    the adaptive version of calc_odds from Episode 30/deck_size_comparison.py
+    :param deck_info: a dict with the deck 'size', 'hand' size and whether we can 'mull', see draw_engine.info_spec
+    :param n_cards: number of cards of the type we care about
+    :param resources: the resource we need to see a copy by
+    :return: an estimate dict, see make_estimate
+    """
+    estimate = run_curve(info_spec(deck_info, n_cards), resources, target_width, seed, max_trials, alpha, method,
+                         n_workers, executor, whole_curve=False)[-1]
+    print(f"Hit {describe(estimate)} with {n_cards} cards in {deck_info['label']}-deck {resources-1}")
+    return estimate
+
+
+def calc_curve(deck_info, n_cards, max_resources, target_width=TARGET_WIDTH, seed=None, max_trials=MAX_TRIALS,
+               alpha=ALPHA, method=METHOD, n_workers=1, executor=None) -> list:
+    """
+    calc_odds for every resource from 2 up to max_resources, from one run that stops once every point is narrow enough
+    :param deck_info: a dict with the deck 'size', 'hand' size and whether we can 'mull', see draw_engine.info_spec
+    :param n_cards: number of cards of the type we care about
+    :param max_resources: the furthest resource we want odds for
+    :return: a list of estimate dicts, one per resource starting at 2
+    """
+    estimates = run_curve(info_spec(deck_info, n_cards), max_resources, target_width, seed, max_trials, alpha, method,
+                          n_workers, executor)
+    for resources, estimate in enumerate(estimates, start=2):
+        print(f"Hit {describe(estimate)} with {n_cards} cards in {deck_info['label']}-deck {resources-1}")
+    return estimates
+
+
+def compare_holds(successes, n_trials, alpha, method, target_width) -> tuple:
+    """
+    :param successes: the hits so far for every threshold
+    :param n_trials: the trials so far for every threshold
+    :return: (the best threshold, an estimate dict per threshold, whether we can stop), see get_optimal_hold
+    """
+    estimates = [make_estimate(int(hits), n_trials, alpha, method) for hits in successes]
+    best = int(np.argmax(successes))
+    best_low = estimates[best]['interval'][0]
+    separated = all(best_low > estimate['interval'][1] for hold, estimate in enumerate(estimates) if hold != best)
+    return best, estimates, separated or max(interval_width(estimate) for estimate in estimates) <= target_width
+
+
+def get_optimal_hold(card_counts, combo_cost, target_width=TARGET_WIDTH, seed=None, max_trials=MAX_TRIALS,
+                     alpha=ALPHA, method=METHOD, n_workers=1) -> tuple:
+    """
+    the adaptive version of mc_combo_calc.get_optimal_hold. Every threshold gets a chunk of trials at a time, and we
+    stop once the best threshold's interval sits above every other threshold's interval, or once every interval is
+    narrower than target_width so the rest is a tie at that precision. We look after every chunk, so the intervals are
+    Bonferroni-corrected for the number of comparisons times the most looks we could take, which keeps the chance of
+    stopping on the wrong threshold under alpha however many looks it takes
+    :param card_counts: a dictionary of card names and counts
+    :param combo_cost: the resource we need to combo by
+    :param target_width: stop comparing once every interval is this narrow
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param max_trials: the most trials to run for any one threshold
+    :param alpha: the chance of calling a threshold best when it's separated from the rest by luck
+    :param method: the proportion_confint method
+    :param n_workers: how many processes to use
+    :return: (the best threshold, a list of estimate dicts, one per threshold, with the corrected intervals)
+    """
+    if max_trials < 1:
+        raise ValueError(f"max_trials is {max_trials}, we need at least 1 trial per threshold")
+    seed = make_seed(seed)
+    holds = range(len(card_counts) + 1)
+    sizes = chunk_sizes(max_trials)
+    comparison_alpha = alpha / (max(len(holds) - 1, 1) * len(sizes))
+    # enough chunks of every threshold per round to keep all the workers busy
+    chunks_per_round = max(1, -(-n_workers // len(holds)))
+    successes = np.zeros(len(holds), dtype=int)
+    n_trials = 0
+    with make_pool(n_workers) as pool:
+        for start in range(0, len(sizes), chunks_per_round):
+            chunks = range(start, min(start + chunks_per_round, len(sizes)))
+            # the seeds line up with parallel_runner.get_optimal_hold, so this is a prefix of that run
+            jobs = [(make_seed(seed, hold, i), sizes[i], combo_spec(card_counts, hold), combo_cost)
+                    for i in chunks for hold in holds]
+            results = run_chunks(jobs, n_workers, pool)
+            # like run_curve, we check after every chunk in order, so where we stop doesn't depend on n_workers
+            for j, i in enumerate(chunks):
+                successes += [histogram[:-1].sum() for histogram in results[j * len(holds):(j + 1) * len(holds)]]
+                n_trials += sizes[i]
+                best, estimates, done = compare_holds(successes, n_trials, comparison_alpha, method, target_width)
+                if done:
+                    break
+            if done:
+                break
+    for hold, estimate in enumerate(estimates):
+        print(f"{describe(estimate)} with a Threshold of {hold} for an {len(card_counts)}-card combo"
+              f" by turn {combo_cost-1}")
+    return best, estimates
+
+
+if __name__ == "__main__":
+    from Reused.mc_combo_calc import CARD_COUNTS, COMBO_COST
+
+    for card_count in CARD_COUNTS:
+        get_optimal_hold(card_count, COMBO_COST, seed=0, n_workers=os.cpu_count())
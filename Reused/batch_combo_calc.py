@@ -0,0 +1,172 @@
+import numpy as np
+
+from Reused import draw_engine
+from Reused.draw_engine import NEVER
+
+# this is the array version of mc_combo_calc, on top of the batch engine in draw_engine. These wrappers keep the
+# card_counts / threshold calling style of mc_combo_calc, and turn it into a deck spec for the engine.
+# code 0 is always a 'miss', and codes 1..K are the combo pieces in the order they show up in card_counts.
+# Speed, per trial: 50-65x the original list-of-strings mc_combo_calc loop, but only about 20x the loop mc_combo_calc
+# has now, since that one deals uint8 codes off a cursor too. What's left is the numpy passes over every trial for
+# each card dealt (the partial shuffle, the draws and the resource step), which don't shrink with the batch size
+
+STARTING_DECK_SIZE = 50
+HAND_SIZE = 6
+N_TRIALS = 100000
+
+
+def combo_spec(card_counts, threshold, deck_size=STARTING_DECK_SIZE, hand_size=HAND_SIZE, mullable=True) -> dict:
+    """
+    the deck spec for mc_combo_calc's game: every piece in hand by combo_cost
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold, see draw_engine.mulligan
+    :param deck_size: the size of the starting deck
+    :param hand_size: the size of the opening hand
+    :param mullable: can we take a mulligan?
+    :return: a deck spec, see draw_engine.make_spec
+    """
+    return draw_engine.make_spec(size=deck_size, hand=hand_size, mull=mullable, threshold=threshold,
+                                 pieces=dict(card_counts), success='all')
+
+
+def make_deck(card_counts, deck_size=STARTING_DECK_SIZE) -> np.ndarray:
+    """
+    make a deck of card codes, 0 for a miss and 1..K for each combo piece, in the order of card_counts
+    :param card_counts: a dictionary of card names and counts
+    :param deck_size: the size of the starting deck
+    :return: a 1-D array of card codes
+    """
+    return draw_engine.make_deck(combo_spec(card_counts, 0, deck_size))
+
+
+def mulligan(counts, threshold, card_counts) -> np.ndarray:
+    """
+    figure out which hands we need to mulligan, same weighting as mc_combo_calc.mulligan
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :param threshold: how many of the needed cards we want before we keep a hand
+    :param card_counts: a dict of cards with counts
+    :return: a boolean array, True where we should mulligan
+    """
+    return draw_engine.mulligan(counts, combo_spec(card_counts, threshold))
+
+
+def combo_check(counts) -> np.ndarray:
+    """
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :return: a boolean array, True where we have at least 1 copy of each combo piece
+    """
+    return (counts[1:] > 0).all(axis=0)
+
+
+def play_first_hits(card_counts, threshold, combo_cost, decks, redeal, hand_size=HAND_SIZE,
+                    mullable=True) -> np.ndarray:
+    """
+    play out a batch of already shuffled decks up to combo_cost, and note when each one first hit the combo.
+    Follows the same rules as mc_combo_calc.do_trial
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold, see mulligan()
+    :param combo_cost: the furthest resource we play up to
+    :param decks: an (n_cards, n_trials) array, the top of each trial's deck
+    :param redeal: a function that takes the indexes of the trials that mulligan and gives back fresh deck tops for them
+    :param hand_size: the size of the opening hand
+    :param mullable: can we take a mulligan?
+    :return: an int8 array of length n_trials, the first stage each trial had the combo in hand (0 for the opening
+    hand, N for after the Nth draw step, so hitting by resource R means a stage of at most R - 2), or NEVER
+    """
+    spec = combo_spec(card_counts, threshold, hand_size=hand_size, mullable=mullable)
+    return draw_engine.play_first_hits(spec, combo_cost, decks, redeal)
+
+
+def play_trials(card_counts, threshold, combo_cost, decks, redeal, hand_size=HAND_SIZE, mullable=True) -> np.ndarray:
+    """
+    play out a batch of already shuffled decks, see play_first_hits
+    :return: a boolean array of length n_trials, True where we hit the combo by combo_cost
+    """
+    return play_first_hits(card_counts, threshold, combo_cost, decks, redeal, hand_size, mullable) != NEVER
+
+
+def do_first_hits(card_counts, threshold, combo_cost, n_trials, rng=None, deck_size=STARTING_DECK_SIZE,
+                  hand_size=HAND_SIZE, mullable=True) -> np.ndarray:
+    """
+    run n_trials of the combo Monte Carlo at once, on fresh shuffles, and note when each one first hit
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold, see mulligan()
+    :param combo_cost: the furthest resource we play up to
+    :param n_trials: how many games to simulate
+    :param rng: a numpy Generator, if None we make a fresh one
+    :param deck_size: the size of the starting deck
+    :param hand_size: the size of the opening hand
+    :param mullable: can we take a mulligan?
+    :return: the first stage each trial hit, see play_first_hits
+    """
+    spec = combo_spec(card_counts, threshold, deck_size, hand_size, mullable)
+    return draw_engine.run_first_hits(spec, combo_cost, n_trials, rng)
+
+
+def do_trials(card_counts, threshold, combo_cost, n_trials, rng=None, **deck_kwargs) -> np.ndarray:
+    """
+    run n_trials of the combo Monte Carlo at once, on fresh shuffles, see do_first_hits
+    :return: a boolean array of length n_trials, True where we hit the combo by combo_cost
+    """
+    return do_first_hits(card_counts, threshold, combo_cost, n_trials, rng, **deck_kwargs) != NEVER
+
+
+def do_bank_first_hits(card_counts, threshold, combo_cost, bank, deck_size=STARTING_DECK_SIZE, hand_size=HAND_SIZE,
+                       mullable=True) -> np.ndarray:
+    """
+    run the combo Monte Carlo on the shared shuffles in a bank, one trial per shuffle, and note when each one first hit
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold, see mulligan()
+    :param combo_cost: the furthest resource we play up to, the bank needs hand_size + 2 * (combo_cost - 2) cards
+    :param bank: a bank dict, see draw_engine.make_bank
+    :param deck_size: the size of the starting deck
+    :param hand_size: the size of the opening hand
+    :param mullable: can we take a mulligan?
+    :return: the first stage each trial hit, see play_first_hits
+    """
+    spec = combo_spec(card_counts, threshold, deck_size, hand_size, mullable)
+    return draw_engine.run_bank_first_hits(spec, combo_cost, bank)
+
+
+def do_bank_trials(card_counts, threshold, combo_cost, bank, **deck_kwargs) -> np.ndarray:
+    """
+    run the combo Monte Carlo on the shared shuffles in a bank, see do_bank_first_hits
+    :return: a boolean array, one entry per shuffle in the bank, True where we hit the combo by combo_cost
+    """
+    return do_bank_first_hits(card_counts, threshold, combo_cost, bank, **deck_kwargs) != NEVER
+
+
+def first_hit_histogram(first_hits, combo_cost) -> np.ndarray:
+    """
+    count how many trials first hit at each stage
+    :param first_hits: an array of first hit stages, see play_first_hits
+    :param combo_cost: the furthest resource the trials were played up to
+    :return: an array of counts, one per stage from the opening hand up to combo_cost, then the trials that never hit
+    """
+    return draw_engine.first_hit_histogram(first_hits, draw_engine.DECK_SPEC, combo_cost)
+
+
+def get_optimal_hold(card_counts, combo_cost, n_trials=N_TRIALS, rng=None) -> int:
+    """
+    the array version of mc_combo_calc.get_optimal_hold
+    :param card_counts: a dictionary of card names and counts
+    :param combo_cost: the resource we need to combo by
+    :param n_trials: how many games to simulate per threshold
+    :param rng: a numpy Generator, if None we make a fresh one
+    :return: the threshold with the most successes
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    successes = []
+    for hold in range(len(card_counts) + 1):
+        trial_successes = int(do_trials(card_counts, hold, combo_cost, n_trials, rng).sum())
+        print(f"{trial_successes} successes in {n_trials} trials, a {trial_successes / n_trials:.2%} hit rate with a"
+              f" Threshold of {hold} for an {len(card_counts)}-card combo by turn {combo_cost-1}")
+        successes.append(trial_successes)
+    return successes.index(max(successes))
+
+
+if __name__ == "__main__":
+    from Reused.mc_combo_calc import CARD_COUNTS, COMBO_COST
+
+    for card_count in CARD_COUNTS:
+        get_optimal_hold(card_count, COMBO_COST)
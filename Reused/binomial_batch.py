@@ -0,0 +1,96 @@
+import numpy as np
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+# the Binomial Calculator (Episode 12/Binomial_Calculator.py) for thousands of decks at once: a season of event
+# results, or every deck in every tournament of a swiss_sim batch. Wins and games come in as arrays of any shape, and
+# every (wins, games) pair is only worked out once however many times it turns up (simulated decks land on the same
+# record all the time), then spread back out. The multiple comparison corrections run along the last axis, so a
+# (tournaments x decks) array gets corrected one tournament at a time
+
+ALPHA = .05
+BASE_ODDS = .5  # a coinflip against the field
+CORRECTION = 'holm'
+
+
+def unique_records(wins, ngames) -> tuple:
+    """
+    :param wins: an int array of wins
+    :param ngames: an int array of games played, that broadcasts against wins
+    :return: (the distinct wins, the distinct games, an array the shape of the input that indexes back into them)
+    """
+    wins, ngames = np.broadcast_arrays(np.asarray(wins, dtype=np.int64), np.asarray(ngames, dtype=np.int64))
+    records, inverse = np.unique(np.stack((wins.ravel(), ngames.ravel()), axis=1), axis=0, return_inverse=True)
+    return records[:, 0], records[:, 1], inverse.reshape(wins.shape)
+
+
+def reject_intervals(odds, ngames, alpha=ALPHA) -> tuple:
+    """
+    statsmodels' binom_test_reject_interval for arrays: the two sided rejection region, end points included
+    :param odds: the win rate under the null hypothesis, a number or array
+    :param ngames: an array of games played
+    :param alpha: the significance level
+    :return: (the lower bounds, the upper bounds) as int arrays
+    """
+    low = stats.binom.ppf(alpha / 2, ngames, odds) - 1
+    high = stats.binom.isf(alpha / 2, ngames, odds) + 1
+    return low.astype(np.int64), high.astype(np.int64)
+
+
+def coinflip_p_values(wins, ngames) -> np.ndarray:
+    """
+    the exact two sided binomial test against BASE_ODDS. With a coinflip the distribution is symmetric, so the p-value
+    is just twice the smaller tail, min(1, 2 * min(P(X <= wins), P(X >= wins)))
+    """
+    return np.minimum(1, 2 * np.minimum(stats.binom.cdf(wins, ngames, BASE_ODDS),
+                                        stats.binom.sf(wins - 1, ngames, BASE_ODDS)))
+
+
+def correct_p_values(p_values, alpha=ALPHA, method=CORRECTION) -> tuple:
+    """
+    correct for testing every deck at once, along the last axis
+    :param p_values: an array of p-values, the last axis being one family of tests
+    :param alpha: the family wise error rate (or false discovery rate, for 'fdr_bh')
+    :param method: 'bonferroni', 'holm' and 'fdr_bh' are done here for the whole array at once, anything else goes to
+    statsmodels' multipletests one family at a time
+    :return: (a bool array of which tests reject, the corrected p-values)
+    """
+    p_values = np.asarray(p_values, dtype=float)
+    n_tests = p_values.shape[-1]
+    if method == 'bonferroni':
+        corrected = np.minimum(p_values * n_tests, 1)
+    elif method in ('holm', 'fdr_bh'):
+        order = np.argsort(p_values, axis=-1)
+        ranked = np.take_along_axis(p_values, order, axis=-1)
+        if method == 'holm':  # step down: the i-th smallest gets multiplied by n - i, and can't beat the one before
+            ranked = np.maximum.accumulate(ranked * np.arange(n_tests, 0, -1), axis=-1)
+        else:  # step up: the i-th smallest gets multiplied by n / i, and can't be worse than the one after
+            ranked = (ranked * n_tests / np.arange(1, n_tests + 1))[..., ::-1]
+            ranked = np.minimum.accumulate(ranked, axis=-1)[..., ::-1]
+        corrected = np.empty_like(ranked)
+        np.put_along_axis(corrected, order, np.minimum(ranked, 1), axis=-1)
+    else:
+        families = p_values.reshape(-1, n_tests)
+        corrected = np.array([multipletests(family, alpha, method)[1] for family in families]).reshape(p_values.shape)
+    return corrected <= alpha, corrected
+
+
+def binom_tests(wins, ngames, alpha=ALPHA, method=CORRECTION) -> dict:
+    """
+    everything the Binomial Calculator works out, for every deck at once
+    :param wins: an int array of wins, the last axis being the decks tested together
+    :param ngames: an int array of games played (at least 1), that broadcasts against wins
+    :param alpha: the significance level
+    :param method: the multiple comparison correction, see correct_p_values
+    :return: a dict of arrays the shape of wins: the 'base_low' and 'base_high' of the rejection region for a
+    coinflip, the 'exp_low' and 'exp_high' of the region at the observed win rate, the coinflip 'p_value', the
+    'corrected' p-value and whether we 'reject' the coinflip after the correction
+    """
+    unique_wins, unique_games, inverse = unique_records(wins, ngames)
+    base_low, base_high = reject_intervals(BASE_ODDS, unique_games, alpha)
+    exp_low, exp_high = reject_intervals(unique_wins / unique_games, unique_games, alpha)
+    p_values = coinflip_p_values(unique_wins, unique_games)
+    results = {'base_low': base_low[inverse], 'base_high': base_high[inverse], 'exp_low': exp_low[inverse],
+               'exp_high': exp_high[inverse], 'p_value': p_values[inverse]}
+    results['reject'], results['corrected'] = correct_p_values(results['p_value'], alpha, method)
+    return results
@@ -0,0 +1,120 @@
+import numpy as np
+
+from Reused.hypergeo_grid import log_comb
+
+# exact odds of seeing at least needed[i] copies of each of several cards (or classes of cards) in the first n cards
+# of a deck, with or without a mulligan. This is the multivariate hypergeometric, done as dynamic programming over the
+# card classes: we go through the classes one at a time, keeping the number of ways to pick j of the cards seen from
+# the classes so far while meeting every minimum, then fill the rest of the cards from everything else in the deck.
+# Like Episode 13/combo_calc.py this is about cards seen, it doesn't play out resourcing (exact_combo_calc does)
+
+
+def comb(n, k) -> float:
+    return float(np.exp(log_comb(n, k)))
+
+
+def class_ways(copies, needed, n_cards) -> np.ndarray:
+    """
+    count the ways to pick cards from the classes so that every class meets its minimum
+    :param copies: a list of how many copies of each class are in the deck
+    :param needed: a list of the minimum copies we need of each class
+    :param n_cards: the most cards we'll pick
+    :return: an array, entry j is the number of ways to pick exactly j cards from the classes, meeting every minimum
+    """
+    ways = np.zeros(n_cards + 1)
+    ways[0] = 1
+    for class_copies, class_needed in zip(copies, needed):
+        picks = np.zeros(n_cards + 1)
+        for x in range(class_needed, min(class_copies, n_cards) + 1):
+            picks[x] = comb(class_copies, x)
+        ways = np.convolve(ways, picks)[:n_cards + 1]
+    return ways
+
+
+def at_least_each(copies, needed, deck_size, draws) -> np.ndarray:
+    """
+    the chance of seeing at least needed[i] copies of every class in the top draws cards
+    :param copies: a list of how many copies of each class are in the deck
+    :param needed: a list of the minimum copies we need of each class
+    :param deck_size: cards in the deck
+    :param draws: cards we see, a number or an array of numbers
+    :return: the probability, with the same shape as draws
+    """
+    draws = np.asarray(draws)
+    ways = class_ways(copies, needed, int(draws.max(initial=0)))
+    other = deck_size - sum(copies)
+    picked = np.arange(len(ways))
+    # the cards that aren't from the classes come from everything else
+    rest = np.exp(log_comb(other, draws[..., None] - picked) - log_comb(deck_size, draws)[..., None])
+    return (ways * rest).sum(axis=-1)
+
+
+def keep_weights(copies) -> np.ndarray:
+    """
+    the mulligan weights of mc_combo_calc.mulligan: a piece with 12 copies counts for 1/4 of a piece with 3 copies
+    """
+    copies = np.asarray(copies, dtype=float)
+    return copies.max() / copies
+
+
+def hand_and_draw_ways(copies, needed, hand_size, n_later) -> dict:
+    """
+    count the ways to pick cards for the opening hand and the cards after it, by which classes made the hand
+    :param copies: a list of how many copies of each class are in the deck
+    :param needed: a list of the minimum copies we need of each class, across the hand and the later cards
+    :param hand_size: the size of the opening hand
+    :param n_later: how many cards we see after the opening hand
+    :return: a dict of {mulligan weight of the hand: array}, entry [j, l] of an array being the number of ways to pick
+    j hand cards and l later cards from the classes, meeting every minimum
+    """
+    states = {0.0: np.zeros((hand_size + 1, n_later + 1))}
+    states[0.0][0, 0] = 1
+    for class_copies, class_needed, weight in zip(copies, needed, keep_weights(copies)):
+        new_states = {}
+        for hand_weight, ways in states.items():
+            for x in range(min(class_copies, hand_size) + 1):
+                # the hand's weight only counts whether we have a piece, not how many
+                key = round(hand_weight + (weight if x else 0), 9)
+                target = new_states.setdefault(key, np.zeros_like(ways))
+                for y in range(max(class_needed - x, 0), min(class_copies - x, n_later) + 1):
+                    target[x:, y:] += comb(class_copies, x) * comb(class_copies - x, y) * \
+                        ways[:hand_size + 1 - x, :n_later + 1 - y]
+        states = new_states
+    return states
+
+
+def kept_odds(copies, needed, deck_size, draws, hand_size, threshold) -> float:
+    """
+    the chance that we keep the opening hand (see mc_combo_calc.mulligan) and see every minimum by draws cards
+    """
+    n_later = draws - hand_size
+    other = deck_size - sum(copies)
+    hand_picks = np.arange(hand_size + 1)[:, None]
+    later_picks = np.arange(n_later + 1)[None, :]
+    # fill the rest of the hand and the later cards from everything else
+    rest = np.exp(log_comb(other, hand_size - hand_picks) + log_comb(other - (hand_size - hand_picks),
+                                                                    n_later - later_picks)
+                  - log_comb(deck_size, hand_size) - log_comb(deck_size - hand_size, n_later))
+    cutoff = threshold * max(copies) / min(copies)
+    return sum((ways * rest).sum() for weight, ways in hand_and_draw_ways(copies, needed, hand_size, n_later).items()
+               if weight >= cutoff - 1e-9)
+
+
+def combo_odds(copies, needed, deck_size, draws, hand_size=6, threshold=None) -> float:
+    """
+    the exact chance of seeing at least needed[i] copies of every class by draws cards, taking a mulligan when the
+    opening hand is under threshold. A mulligan is a fresh shuffle, and we only get one
+    :param copies: a list of how many copies of each class are in the deck
+    :param needed: a list of the minimum copies we need of each class
+    :param deck_size: cards in the deck
+    :param draws: cards we've seen by the turn we care about, at least hand_size
+    :param hand_size: the size of the opening hand
+    :param threshold: the mulligan threshold, weighted like mc_combo_calc.mulligan. None never mulligans
+    :return: the probability
+    """
+    fresh = float(at_least_each(copies, needed, deck_size, draws))
+    if threshold is None:
+        return fresh
+    keep_and_hit = kept_odds(copies, needed, deck_size, draws, hand_size, threshold)
+    keep = kept_odds(copies, [0] * len(copies), deck_size, draws, hand_size, threshold)
+    return keep_and_hit + (1 - keep) * fresh
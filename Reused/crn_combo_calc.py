@@ -0,0 +1,93 @@
+import math
+
+import numpy as np
+
+from Reused.batch_combo_calc import do_bank_trials, N_TRIALS, HAND_SIZE
+from Reused.draw_engine import (deck_depth, first_hit_histogram, hits_by_cost, info_spec, make_bank, make_spec,
+                                run_bank_first_hits, NEVER)
+
+# common random numbers: every threshold, deck and turn we compare gets played on the same bank of shuffles.
+# That turns "is threshold 2 better than threshold 1" into a paired comparison, where the noise that both runs share
+# cancels out, so we need a lot fewer trials to see a real difference. The bank is only shuffled once, too
+
+
+def bank_size(hand_size, combo_cost) -> int:
+    """
+    :return: how many cards off the top a bank needs for games up to combo_cost, see draw_engine.deck_depth
+    """
+    return deck_depth(make_spec(hand=hand_size), combo_cost)
+
+
+def paired_difference(hits, base_hits) -> tuple:
+    """
+    compare two runs played on the same shuffles
+    :param hits: a boolean array of hits
+    :param base_hits: a boolean array of hits from the same bank
+    :return: (mean difference in hit rate, standard error of that difference)
+    """
+    difference = hits.astype(np.int8) - base_hits.astype(np.int8)
+    return difference.mean(), difference.std(ddof=1) / math.sqrt(len(difference))
+
+
+def get_optimal_hold(card_counts, combo_cost, bank=None, n_trials=N_TRIALS, rng=None) -> int:
+    """
+    the common random numbers version of mc_combo_calc.get_optimal_hold, every threshold plays the same shuffles
+    :param card_counts: a dictionary of card names and counts
+    :param combo_cost: the resource we need to combo by
+    :param bank: a bank dict from draw_engine.make_bank, if None we make one
+    :param n_trials: how many shuffles to put in the bank, if we're making it
+    :param rng: a numpy Generator for making the bank
+    :return: the threshold with the most successes
+    """
+    if bank is None:
+        bank = make_bank(n_trials, bank_size(HAND_SIZE, combo_cost), rng)
+    hits = [do_bank_trials(card_counts, hold, combo_cost, bank) for hold in range(len(card_counts) + 1)]
+    successes = [int(hold_hits.sum()) for hold_hits in hits]
+    best = successes.index(max(successes))
+    for hold, hold_hits in enumerate(hits):
+        difference, std_err = paired_difference(hold_hits, hits[best])
+        print(f"{successes[hold]} successes in {len(hold_hits)} trials, a {hold_hits.mean():.2%} hit rate with a"
+              f" Threshold of {hold} for an {len(card_counts)}-card combo by turn {combo_cost-1}"
+              f" ({difference:+.2%} +/- {std_err:.2%} vs. Threshold {best})")
+    return best
+
+
+def calc_odds(deck_info, n_cards, resources, bank) -> int:
+    """
+    the common random numbers version of calc_odds from Episode 30/deck_size_comparison.py
+    :param deck_info: a dict with the deck 'size', 'hand' size and whether we can 'mull', see draw_engine.info_spec
+    :param n_cards: number of cards of the type we care about
+    :param resources: the resource we need to see a copy by
+    :param bank: a bank dict from draw_engine.make_bank, deep enough for the biggest hand and resources
+    :return: the number of games where we saw a copy
+    """
+    first_hits = run_bank_first_hits(info_spec(deck_info, n_cards), resources, bank)
+    hits = int((first_hits != NEVER).sum())
+    print(f"Hit {hits} times in {bank['rolls'].shape[1]} with {n_cards} cards in {deck_info['label']}-deck "
+          f"{resources-1}")
+    return hits
+
+
+def calc_curve(deck_info, n_cards, max_resources, bank) -> list:
+    """
+    calc_odds for every resource from 2 up to max_resources, from one pass over the bank
+    :param deck_info: a dict with the deck 'size', 'hand' size and whether we can 'mull', see draw_engine.info_spec
+    :param n_cards: number of cards of the type we care about
+    :param max_resources: the furthest resource we want odds for
+    :param bank: a bank dict from draw_engine.make_bank, deep enough for the biggest hand and max_resources
+    :return: a list of the number of games where we saw a copy by each resource, starting at 2
+    """
+    spec = info_spec(deck_info, n_cards)
+    first_hits = run_bank_first_hits(spec, max_resources, bank)
+    hits = [int(hit) for hit in hits_by_cost(first_hit_histogram(first_hits, spec, max_resources))]
+    print(f"Hit {hits} times in {len(first_hits)} with {n_cards} cards in {deck_info['label']}-deck by turns "
+          f"1-{max_resources-1}")
+    return hits
+
+
+if __name__ == "__main__":
+    from Reused.mc_combo_calc import CARD_COUNTS, COMBO_COST
+
+    shared_bank = make_bank(N_TRIALS, bank_size(HAND_SIZE, COMBO_COST))
+    for card_count in CARD_COUNTS:
+        get_optimal_hold(card_count, COMBO_COST, shared_bank)
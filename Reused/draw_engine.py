@@ -0,0 +1,353 @@
+import numpy as np
+
+# the draw-and-mulligan engine every combo/draw-odds simulation runs on. A deck spec says what the game looks like
+# (deck size, opening hand, mulligans, draws and resources per turn, the pieces we want and what counts as a hit),
+# and the engine plays whole batches of games at once: decks are the columns of a 2-D array of uint8 card codes, and
+# each hand is a column of counts per card type. Code 0 is always a 'miss', codes 1..K are the pieces, in the order
+# they show up in the spec's 'pieces'
+
+NEVER = -1  # the first hit stage of a trial that never hit
+ENGINE_VERSION = 1  # bump this whenever a change moves seeded results, so cached results get thrown out
+
+DECK_SPEC = {'size': 50,  # cards in the deck
+             'hand': 6,  # cards in the opening hand
+             'keep': None,  # cards we keep from the opening hand, the rest go to the bottom. None keeps them all
+             'mull': True,  # can we take a mulligan?
+             'threshold': 1,  # the mulligan threshold, see mulligan()
+             'mulligan_weights': None,  # {piece: weight} to score hands with, None weighs pieces by their copies
+             'resource_order': None,  # pieces in the order we give them up, None gives up the most copied piece
+             'draw': 2,  # cards drawn each turn
+             'resource': 1,  # cards resourced each turn
+             'opening_resources': 2,  # cards resourced from the opening hand
+             'mulligan_resources': 4,  # cards resourced from a mulliganed hand, mc_combo_calc resources twice more
+             'pieces': {'hit': 1},  # the cards we care about, and how many copies of each
+             'success': 'all'}  # 'all' pieces, 'any' piece, a dict of {piece: copies needed}, or a function of counts
+
+# the first-class base variants, on top of DECK_SPEC
+BLUE_BASE = {'hand': 5}
+YELLOW_BASE = {'hand': 9, 'keep': 6, 'mull': False}  # draw 9, put 3 on the bottom
+
+
+def make_spec(*variants, **overrides) -> dict:
+    """
+    fill in a deck spec from the defaults
+    :param variants: dicts of spec values applied in order, e.g. BLUE_BASE
+    :param overrides: any other spec values
+    :return: a complete spec dict
+    """
+    spec = dict(DECK_SPEC)
+    for variant in variants:
+        spec.update(variant)
+    spec.update(overrides)
+    return spec
+
+
+def info_spec(deck_info, n_cards) -> dict:
+    """
+    the spec for the deck size comparisons: see at least one of n_cards copies
+    :param deck_info: a dict with the deck 'size', 'hand' size, whether we can 'mull' and optionally how many to 'keep'
+    :param n_cards: number of cards of the type we care about
+    :return: a deck spec
+    """
+    return make_spec(size=deck_info['size'], hand=deck_info['hand'], keep=deck_info.get('keep'),
+                     mull=deck_info['mull'], pieces={'hit': n_cards})
+
+
+def make_deck(spec) -> np.ndarray:
+    """
+    make a deck of card codes, 0 for a miss and 1..K for each piece, in the order of spec['pieces']
+    :param spec: a deck spec
+    :return: a 1-D array of card codes
+    """
+    deck = np.zeros(spec['size'], dtype=np.uint8)  # everything is a miss until we say otherwise
+    start = 0
+    for code, copies in enumerate(spec['pieces'].values(), start=1):
+        deck[start:start + copies] = code
+        start += copies
+    return deck
+
+
+def count_turns(spec, combo_cost) -> int:
+    """
+    :return: how many turns of draws it takes to get from the opening resources to combo_cost
+    """
+    return max(-(-(combo_cost - spec['opening_resources']) // spec['resource']), 0)
+
+
+def deck_depth(spec, combo_cost) -> int:
+    """
+    :return: how many cards off the top the longest game up to combo_cost will see
+    """
+    return spec['hand'] + spec['draw'] * count_turns(spec, combo_cost)
+
+
+def shuffle_positions(deck_size, rolls) -> np.ndarray:
+    """
+    shuffle the positions of a deck for a batch of trials. We only ever look at the top few cards, so we only do the
+    first few steps of a Fisher-Yates shuffle, which leaves the top cards exactly as random as a full shuffle would
+    :param deck_size: the size of the deck, at most 255
+    :param rolls: an (n_cards, n_trials) array of uniform random numbers, one row per card we need shuffled
+    :return: an (n_cards, n_trials) array, every column is the deck positions that ended up on top in that trial
+    """
+    n_cards, n_trials = rolls.shape
+    # decks run down the columns so that "the i-th card of every deck" is one contiguous row
+    positions = np.repeat(np.arange(deck_size, dtype=np.uint8)[:, None], n_trials, axis=1)
+    flat_positions = positions.reshape(-1)
+    trials = np.arange(n_trials)
+    for i in range(min(n_cards, deck_size - 1)):
+        # swap card i with a random card from i to the bottom of the deck
+        swap = (i + (rolls[i] * (deck_size - i)).astype(np.intp)) * n_trials + trials
+        top = positions[i].copy()
+        positions[i] = flat_positions[swap]
+        flat_positions[swap] = top
+    return positions[:n_cards]
+
+
+def shuffle_decks(deck, n_trials, n_cards, rng) -> np.ndarray:
+    """
+    shuffle n_trials copies of a deck at once
+    :param deck: a 1-D array of card codes
+    :param n_trials: the number of decks we want
+    :param n_cards: how many cards off the top we need
+    :param rng: a numpy Generator
+    :return: an (n_cards, n_trials) array, every column is the top of a shuffled deck
+    """
+    return deck[shuffle_positions(len(deck), rng.random((n_cards, n_trials)))]
+
+
+def make_bank(n_trials, n_cards, rng=None) -> dict:
+    """
+    make a bank of shuffles to share between runs (common random numbers). Every run dealt from the same bank sees the
+    same shuffles, so the differences between thresholds or decks aren't buried under separate sampling noise
+    :param n_trials: how many shuffles to keep
+    :param n_cards: how many cards off the top the longest game will need
+    :param rng: a numpy Generator, if None we make a fresh one
+    :return: a bank dict, the rolls for the opening shuffle and the mulligan shuffle, plus a cache of positions by size
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    return {'rolls': rng.random((n_cards, n_trials)), 'mulligan_rolls': rng.random((n_cards, n_trials)),
+            'positions': {}}
+
+
+def deal_from_bank(bank, deck) -> tuple:
+    """
+    deal a deck using the bank's shuffles. Decks of the same size get the same positions, so a deck with a different
+    mix of cards gets the same shuffle, and different sized decks are driven by the same rolls
+    :param bank: a bank dict, see make_bank
+    :param deck: a 1-D array of card codes
+    :return: (opening decks, mulligan decks), both (n_cards, n_trials) arrays of card codes
+    """
+    deck_size = len(deck)
+    if deck_size not in bank['positions']:  # we only shuffle each deck size once
+        bank['positions'][deck_size] = (shuffle_positions(deck_size, bank['rolls']),
+                                        shuffle_positions(deck_size, bank['mulligan_rolls']))
+    opening, mulligan_positions = bank['positions'][deck_size]
+    return deck[opening], deck[mulligan_positions]
+
+
+def count_cards(cards, n_codes) -> np.ndarray:
+    """
+    turn a block of drawn cards into counts of each card type
+    :param cards: an (n_cards, n_trials) array of card codes
+    :param n_codes: the number of card types, including the miss
+    :return: an (n_codes, n_trials) array of counts
+    """
+    counts = np.zeros((n_codes, cards.shape[1]), dtype=np.int8)
+    draw(counts, cards)
+    return counts
+
+
+def draw(counts, cards) -> None:
+    """
+    add a block of drawn cards to the hand counts, in place
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :param cards: an (n_cards, n_trials) array of card codes
+    :return: None
+    """
+    n_trials = counts.shape[1]
+    trials = np.arange(n_trials)
+    flat_counts = counts.reshape(-1)
+    for row in cards:  # each trial only gets one card per row, so there's no double counting
+        flat_counts[row.astype(np.intp) * n_trials + trials] += 1
+
+
+def mulligan(counts, spec) -> np.ndarray:
+    """
+    figure out which hands we need to mulligan. By default it's the same weighting as mc_combo_calc.mulligan, with
+    'mulligan_weights' in the spec we add up the weights of the pieces in hand and keep at 'threshold' or more
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :param spec: a deck spec, we use its 'threshold', 'mulligan_weights' and 'pieces'
+    :return: a boolean array, True where we should mulligan
+    """
+    if spec['mulligan_weights'] is not None:
+        weights = np.array([spec['mulligan_weights'].get(piece, 0) for piece in spec['pieces']], dtype=float)
+        return weights @ (counts[1:] > 0) < spec['threshold']
+    copies = np.array(list(spec['pieces'].values()), dtype=float)
+    weights = copies.max() / copies  # a piece with 12 copies counts for 1/4 of a piece with 3 copies
+    needed_cards = weights @ (counts[1:] > 0)
+    return needed_cards < spec['threshold'] * copies.max() / copies.min()
+
+
+def resource(counts, order=None) -> None:
+    """
+    resource one card from every hand, in place. A miss if we have one, otherwise the piece we have the most copies of
+    (ties go to the piece listed first, like mc_combo_calc.resource)
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :param order: piece codes in the order we'd rather give them up, to use instead of the most copies rule
+    :return: None
+    """
+    n_trials = counts.shape[1]
+    if order is not None:
+        to_resource = np.full(n_trials, order[-1], dtype=np.intp)
+        for code in order[-2::-1]:  # walk back from the pieces we want most, so the first one in order wins
+            to_resource = np.where(counts[code] > 0, code, to_resource)
+        to_resource = np.where(counts[0] > 0, 0, to_resource)
+        counts.reshape(-1)[to_resource * n_trials + np.arange(n_trials)] -= 1
+        return
+    # np.argmax is slow along a short first axis, so walk the handful of pieces ourselves
+    most_copies = counts[1]
+    to_resource = np.ones(n_trials, dtype=np.intp)
+    for code in range(2, counts.shape[0]):
+        more = counts[code] > most_copies  # strictly more, so ties stay with the earlier piece
+        to_resource = np.where(more, code, to_resource)
+        most_copies = np.maximum(most_copies, counts[code])
+    to_resource = np.where(counts[0] > 0, 0, to_resource)  # a miss always goes first
+    counts.reshape(-1)[to_resource * n_trials + np.arange(n_trials)] -= 1
+
+
+def check_success(counts, spec) -> np.ndarray:
+    """
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :param spec: a deck spec, we use its 'success' and 'pieces'
+    :return: a boolean array, True where the hand counts as a hit
+    """
+    success = spec['success']
+    if success == 'all':  # at least 1 copy of each piece
+        return (counts[1:] > 0).all(axis=0)
+    if success == 'any':  # at least 1 copy of any piece
+        return (counts[1:] > 0).any(axis=0)
+    if isinstance(success, dict):  # at least N copies of the listed pieces
+        codes = {piece: code for code, piece in enumerate(spec['pieces'], start=1)}
+        return np.logical_and.reduce([counts[codes[piece]] >= needed for piece, needed in success.items()])
+    return success(counts)
+
+
+def resource_order(spec):
+    """
+    :param spec: a deck spec
+    :return: the spec's 'resource_order' as a tuple of piece codes, or None for the most copies rule
+    """
+    if spec['resource_order'] is None:
+        return None
+    codes = {piece: code for code, piece in enumerate(spec['pieces'], start=1)}
+    order = [codes[piece] for piece in spec['resource_order']]
+    # any piece left out of the order is the last one we'd give up
+    return tuple(order + [code for code in codes.values() if code not in order])
+
+
+def resource_many(counts, n_cards, trials=None, order=None) -> None:
+    """
+    resource (or put back) n_cards from some of the hands, in place
+    :param counts: an (n_codes, n_trials) array of hand counts
+    :param n_cards: how many cards each hand loses
+    :param trials: the indexes of the hands to use, None for all of them
+    :param order: the resource order, see resource_order
+    :return: None
+    """
+    if trials is None:
+        for _ in range(n_cards):
+            resource(counts, order)
+        return
+    some_counts = np.ascontiguousarray(counts[:, trials])
+    for _ in range(n_cards):
+        resource(some_counts, order)
+    counts[:, trials] = some_counts
+
+
+def play_first_hits(spec, combo_cost, decks, redeal) -> np.ndarray:
+    """
+    play out a batch of already shuffled decks up to combo_cost, and note when each one first hit
+    :param spec: a deck spec
+    :param combo_cost: the furthest resource we play up to
+    :param decks: an (n_cards, n_trials) array, the top of each trial's deck, at least deck_depth cards deep
+    :param redeal: a function that takes the indexes of the trials that mulligan and gives back fresh deck tops for them
+    :return: an int8 array of length n_trials, the first stage each trial had a hit (0 for the opening hand, N for
+    after the Nth turn of draws) or NEVER
+    """
+    n_codes = len(spec['pieces']) + 1
+    hand_size = spec['hand']
+    order = resource_order(spec)
+
+    counts = count_cards(decks[:hand_size], n_codes)
+    mulled = np.flatnonzero(mulligan(counts, spec)) if spec['mull'] else []
+    if len(mulled):
+        # a mulligan is a fresh shuffle of the whole deck
+        decks = decks.copy()
+        decks[:, mulled] = redeal(mulled)
+        counts[:, mulled] = count_cards(decks[:hand_size, mulled], n_codes)
+    if spec['keep'] is not None:
+        # the cards we don't keep go to the bottom, we put back the same cards we'd resource first
+        resource_many(counts, hand_size - spec['keep'], order=order)
+    resource_many(counts, spec['opening_resources'], order=order)
+    if len(mulled):
+        resource_many(counts, spec['mulligan_resources'] - spec['opening_resources'], mulled, order)
+
+    first_hits = np.where(check_success(counts, spec), 0, NEVER).astype(np.int8)
+    # the cards we skip past after a mulligan were never seen, so drawing from just after the hand is the same game
+    n_draws = spec['draw']
+    for turn in range(count_turns(spec, combo_cost)):
+        draw(counts, decks[hand_size + n_draws * turn:hand_size + n_draws * (turn + 1)])
+        resource_many(counts, spec['resource'], order=order)
+        first_hits[check_success(counts, spec) & (first_hits == NEVER)] = turn + 1
+    return first_hits
+
+
+def run_first_hits(spec, combo_cost, n_trials, rng=None) -> np.ndarray:
+    """
+    play n_trials games at once on fresh shuffles, see play_first_hits
+    :param spec: a deck spec
+    :param combo_cost: the furthest resource we play up to
+    :param n_trials: how many games to simulate
+    :param rng: a numpy Generator, if None we make a fresh one
+    :return: the first stage each trial hit, see play_first_hits
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    deck = make_deck(spec)
+    n_cards = deck_depth(spec, combo_cost)
+    decks = shuffle_decks(deck, n_trials, n_cards, rng)
+    # only the trials that mulligan need a second shuffle
+    return play_first_hits(spec, combo_cost, decks, lambda mulled: shuffle_decks(deck, len(mulled), n_cards, rng))
+
+
+def run_bank_first_hits(spec, combo_cost, bank) -> np.ndarray:
+    """
+    play one game per shuffle in a bank, see make_bank and play_first_hits
+    :param spec: a deck spec
+    :param combo_cost: the furthest resource we play up to, the bank needs to be deck_depth cards deep
+    :param bank: a bank dict
+    :return: the first stage each trial hit, see play_first_hits
+    """
+    decks, mulligan_decks = deal_from_bank(bank, make_deck(spec))
+    return play_first_hits(spec, combo_cost, decks, lambda mulled: mulligan_decks[:, mulled])
+
+
+def first_hit_histogram(first_hits, spec, combo_cost) -> np.ndarray:
+    """
+    count how many trials first hit at each stage
+    :param first_hits: an array of first hit stages, see play_first_hits
+    :param spec: the deck spec the trials were played with
+    :param combo_cost: the furthest resource the trials were played up to
+    :return: an array of counts, one per stage from the opening hand up to combo_cost, then the trials that never hit
+    """
+    n_stages = count_turns(spec, combo_cost) + 1
+    return np.bincount(np.where(first_hits == NEVER, n_stages, first_hits), minlength=n_stages + 1)
+
+
+def hits_by_cost(histogram) -> np.ndarray:
+    """
+    turn a first hit histogram into the number of trials that have hit by each stage
+    :param histogram: an array of counts from first_hit_histogram
+    :return: an array of hit counts, the first entry is hits in the opening hand, then by the end of each turn. With
+    the default spec that's hits by resource 2, 3 and so on
+    """
+    return np.cumsum(histogram[:-1])
@@ -0,0 +1,206 @@
+import math
+import operator
+from functools import lru_cache
+
+import numpy as np
+
+from Reused.batch_combo_calc import do_trials, N_TRIALS, STARTING_DECK_SIZE, HAND_SIZE
+from Reused.draw_engine import ENGINE_VERSION
+from Reused.result_cache import cached_array
+
+# the exact version of mc_combo_calc. The game only cares about how many of each card type are in our hand and in
+# the deck, so instead of shuffling we push probability through every (hand, deck) count state turn by turn.
+# Card types are in the same order as batch_combo_calc: index 0 is a 'miss', then the combo pieces in card_counts order
+
+
+@lru_cache(maxsize=None)
+def draw_outcomes(deck, n_draws) -> tuple:
+    """
+    every way to draw n_draws cards from a deck of counts, with its multivariate hypergeometric probability
+    :param deck: a tuple of how many of each card type are left in the deck
+    :param n_draws: how many cards we draw
+    :return: a tuple of (drawn_counts, probability) pairs
+    """
+    outcomes = []
+    total_ways = math.comb(sum(deck), n_draws)
+
+    def split(card_type, left, drawn, ways):
+        if card_type == len(deck) - 1:  # whatever is left has to come from the last card type
+            if left <= deck[card_type]:
+                outcomes.append((drawn + (left,), ways * math.comb(deck[card_type], left) / total_ways))
+            return
+        for n in range(min(left, deck[card_type]) + 1):
+            split(card_type + 1, left - n, drawn + (n,), ways * math.comb(deck[card_type], n))
+
+    split(0, n_draws, (), 1)
+    return tuple(outcomes)
+
+
+def mulligan(hand, threshold, card_counts) -> bool:
+    """
+    same rule as mc_combo_calc.mulligan, on a tuple of hand counts
+    """
+    copies = list(card_counts.values())
+    needed_cards = sum(max(copies) / n for n, held in zip(copies, hand[1:]) if held)
+    return needed_cards < threshold * max(copies) / min(copies)
+
+
+@lru_cache(maxsize=None)
+def resource(hand) -> tuple:
+    """
+    same rule as mc_combo_calc.resource: a miss if we have one, otherwise the piece we have the most copies of,
+    with ties going to the piece listed first
+    :param hand: a tuple of hand counts
+    :return: the hand counts with one card resourced
+    """
+    if hand[0]:
+        to_resource = 0
+    else:
+        to_resource = max(range(1, len(hand)), key=lambda code: (hand[code], -code))
+    return hand[:to_resource] + (hand[to_resource] - 1,) + hand[to_resource + 1:]
+
+
+def combo_check(hand) -> bool:
+    return all(hand[1:])
+
+
+def subtract(deck, drawn) -> tuple:
+    return tuple(map(operator.sub, deck, drawn))
+
+
+def add(hand, drawn) -> tuple:
+    return tuple(map(operator.add, hand, drawn))
+
+
+def can_still_hit(hand, remaining, draws_left) -> bool:
+    """
+    can this state still get every piece into hand? Not if a piece is gone from the deck and the hand, or if we're
+    missing more pieces than we have draws left
+    """
+    missing = 0
+    for held, left in zip(hand[1:], remaining[1:]):
+        if not held:
+            if not left:
+                return False
+            missing += 1
+    return missing <= draws_left
+
+
+@lru_cache(maxsize=None)
+def next_states(hand, remaining) -> tuple:
+    """
+    one turn from a (hand, deck) state: draw 2 and resource a card. Cached, since the mulligan thresholds and the turns
+    all run through a lot of the same states
+    :return: a tuple of ((hand, deck), probability) pairs
+    """
+    return tuple(((resource(add(hand, drawn)), subtract(remaining, drawn)), probability)
+                 for drawn, probability in draw_outcomes(remaining, min(2, sum(remaining))))
+
+
+def starting_states(card_counts, threshold, deck, hand_size, mullable) -> dict:
+    """
+    the probability of every (hand, deck) state after the opening hand, mulligan and the opening resources
+    :return: a dict of {(hand, deck): probability}
+    """
+    def keep(states, hand, probability, n_resources):
+        remaining = subtract(deck, hand)
+        for _ in range(n_resources):
+            hand = resource(hand)
+        states[(hand, remaining)] = states.get((hand, remaining), 0) + probability
+
+    states = {}
+    mulligan_odds = 0
+    for hand, probability in draw_outcomes(deck, hand_size):
+        if mullable and mulligan(hand, threshold, card_counts):
+            mulligan_odds += probability
+        else:
+            keep(states, hand, probability, 2)
+    if mulligan_odds:
+        # a mulligan is a fresh shuffle whatever we threw back, so every mulligan shares one set of new hands, and
+        # starting_hand resources twice more once the mulligan call returns
+        for new_hand, new_probability in draw_outcomes(deck, hand_size):
+            keep(states, new_hand, mulligan_odds * new_probability, 4)
+    return states
+
+
+def exact_odds(card_counts, threshold, combo_cost, deck_size=STARTING_DECK_SIZE, hand_size=HAND_SIZE,
+               mullable=True) -> float:
+    """
+    the exact chance of having every combo piece in hand by combo_cost, playing the same way as mc_combo_calc.do_trial
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold
+    :param combo_cost: the resource we need to combo by
+    :param deck_size: the size of the starting deck
+    :param hand_size: the size of the opening hand
+    :param mullable: can we take a mulligan?
+    :return: the probability of hitting the combo
+    """
+    deck = (deck_size - sum(card_counts.values()),) + tuple(card_counts.values())
+    states = starting_states(card_counts, threshold, deck, hand_size, mullable)
+    hit_odds = 0
+    current_resources = 2
+    while True:
+        live_states = {}
+        for (hand, remaining), probability in states.items():
+            if combo_check(hand):  # once we've hit we stop playing, so the state drops out
+                hit_odds += probability
+            else:
+                live_states[(hand, remaining)] = probability
+        if current_resources >= combo_cost or not live_states:
+            return hit_odds
+        turns_left = combo_cost - current_resources
+        states = {}
+        for (hand, remaining), probability in live_states.items():
+            if not can_still_hit(hand, remaining, 2 * turns_left):
+                continue
+            for state, step_probability in next_states(hand, remaining):
+                states[state] = states.get(state, 0) + probability * step_probability
+        current_resources += 1
+
+
+def get_optimal_hold(card_counts, combo_cost, cache_dir=None, **deck_kwargs) -> int:
+    """
+    the exact version of mc_combo_calc.get_optimal_hold
+    :param card_counts: a dictionary of card names and counts
+    :param combo_cost: the resource we need to combo by
+    :param cache_dir: a result_cache folder to keep the odds in, or None to always work them out
+    :param deck_kwargs: deck_size, hand_size and mullable, passed through to exact_odds
+    :return: the threshold with the best hit rate
+    """
+    odds = []
+    for hold in range(len(card_counts) + 1):
+        params = [card_counts, hold, combo_cost, sorted(deck_kwargs.items()), ENGINE_VERSION]
+        hold_odds = float(cached_array(cache_dir, 'exact_odds', params,
+                                       lambda: exact_odds(card_counts, hold, combo_cost, **deck_kwargs)))
+        print(f"{hold_odds:.2%} hit rate with a Threshold of {hold} for an {len(card_counts)}-card combo"
+              f" by turn {combo_cost-1}")
+        odds.append(hold_odds)
+    return odds.index(max(odds))
+
+
+def cross_check(card_counts, threshold, combo_cost, n_trials=N_TRIALS, rng=None, **deck_kwargs) -> dict:
+    """
+    run the exact solver and the batch Monte Carlo on the same question and see if they agree
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold
+    :param combo_cost: the resource we need to combo by
+    :param n_trials: how many Monte Carlo trials to run
+    :param rng: a numpy Generator, if None we make a fresh one
+    :param deck_kwargs: deck_size, hand_size and mullable, passed to both engines
+    :return: a dict with the 'exact' odds, the 'mc' estimate, its 'std_err' and the 'z' score of the difference
+    """
+    exact = exact_odds(card_counts, threshold, combo_cost, **deck_kwargs)
+    mc = do_trials(card_counts, threshold, combo_cost, n_trials, rng, **deck_kwargs).mean()
+    std_err = math.sqrt(exact * (1 - exact) / n_trials)
+    z = (mc - exact) / std_err if std_err else 0.0
+    print(f"exact: {exact:.4%}, Monte Carlo: {mc:.4%} over {n_trials} trials, z = {z:+.2f}")
+    return {'exact': exact, 'mc': float(mc), 'std_err': std_err, 'z': z}
+
+
+if __name__ == "__main__":
+    from Reused.mc_combo_calc import CARD_COUNTS, COMBO_COST
+
+    for card_count in CARD_COUNTS:
+        get_optimal_hold(card_count, COMBO_COST)
+        for hold in range(len(card_count) + 1):
+            cross_check(card_count, hold, COMBO_COST, rng=np.random.default_rng(hold))
@@ -0,0 +1,70 @@
+import numpy as np
+
+# hypergeometric odds for whole grids at once. Every argument can be a number or an array, and they broadcast against
+# each other like any numpy math, so a sweep over deck size x copies x cards seen x threshold is one call instead of a
+# scipy call per cell. Everything comes out of one table of log factorials, made when the module loads.
+# The argument order follows scipy.stats.hypergeom: (k, deck_size, copies, draws)
+
+MAX_DECK_SIZE = 1000  # the biggest deck (or any other count) the table covers
+LOG_FACTORIAL = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, MAX_DECK_SIZE + 1)))))
+
+
+def log_comb(n, k) -> np.ndarray:
+    """
+    :return: log(n choose k), -inf wherever k < 0 or k > n
+    """
+    n, k = np.broadcast_arrays(np.asarray(n, dtype=np.intp), np.asarray(k, dtype=np.intp))
+    valid = (k >= 0) & (k <= n)
+    n_valid = np.where(valid, n, 0)
+    k_valid = np.where(valid, k, 0)
+    result = LOG_FACTORIAL[n_valid] - LOG_FACTORIAL[k_valid] - LOG_FACTORIAL[n_valid - k_valid]
+    return np.where(valid, result, -np.inf)
+
+
+def pmf(k, deck_size, copies, draws) -> np.ndarray:
+    """
+    the chance of seeing exactly k copies
+    :param k: how many copies we see
+    :param deck_size: cards in the deck
+    :param copies: copies of the card in the deck
+    :param draws: cards we look at
+    :return: an array of probabilities, broadcast over the arguments
+    """
+    log_odds = log_comb(copies, k) + log_comb(np.subtract(deck_size, copies), np.subtract(draws, k)) \
+        - log_comb(deck_size, draws)
+    return np.exp(log_odds)
+
+
+def cdf(k, deck_size, copies, draws) -> np.ndarray:
+    """
+    the chance of seeing at most k copies, same arguments as pmf
+    """
+    k, deck_size, copies, draws = np.broadcast_arrays(k, deck_size, copies, draws)
+    # add up the pmf over a last axis of 0..the biggest k, masking out anything past each cell's own k
+    seen = np.arange(max(int(np.max(k, initial=0)), 0) + 1)
+    odds = pmf(seen, deck_size[..., None], copies[..., None], draws[..., None])
+    return np.where(seen <= k[..., None], odds, 0).sum(axis=-1)
+
+
+def sf(k, deck_size, copies, draws) -> np.ndarray:
+    """
+    the chance of seeing more than k copies, same arguments as pmf
+    """
+    return 1 - cdf(k, deck_size, copies, draws)
+
+
+def at_least(k, deck_size, copies, draws) -> np.ndarray:
+    """
+    the chance of seeing k or more copies, same arguments as pmf
+    """
+    return sf(np.subtract(k, 1), deck_size, copies, draws)
+
+
+def expected_capped(max_cards, deck_size, copies, draws) -> np.ndarray:
+    """
+    the average number of copies we see, when anything past max_cards doesn't count, same arguments as pmf
+    """
+    max_cards, deck_size, copies, draws = np.broadcast_arrays(max_cards, deck_size, copies, draws)
+    seen = np.arange(int(np.max(draws, initial=0)) + 1)
+    odds = pmf(seen, deck_size[..., None], copies[..., None], draws[..., None])
+    return (np.minimum(seen, max_cards[..., None]) * odds).sum(axis=-1)
@@ -1,8 +1,11 @@
 import random
 
 # this script calculates the odds of getting all parts of an N-card combo using a Monte Carlo Simulation
+# cards are uint8 codes (0 is a 'miss', then the combo pieces in card_counts order) and a hand is a count of each code
+# batch_combo_calc.py runs the same game on whole arrays of decks at once, use that for big runs
 
 STARTING_DECK_SIZE = 50
+HAND_SIZE = 6
 CARD_COUNTS = [{'Heroic Sacrifice': 3, 'Traitorous': 3},
                {'DJ Death Star': 3, 'Wanted': 3, 'Resupply': 3},
                {'DJ Death Star': 3, 'Wanted': 3, 'Resupply': 3, 'Unit Boba': 3}]
@@ -13,25 +16,38 @@ COMBO_COST = 6  # this is the resource we need to combo by, if you're ok with wa
 N_TRIALS = 100000  # how many times to run the Monte Carlo
 
 
-def make_deck(card_counts) -> list:
+def make_deck(card_counts) -> bytearray:
     """
-    make a deck of cards as a list, consisting of the cards we want in the appropriate proportions and "miss"
+    make a deck of card codes, 0 for a 'miss' and 1..K for the cards we want, in the order of card_counts. We make it
+    once and deal every trial from it, see draw_card
     :param card_counts: a dictionary of card names and counts
-    :return: a list of cards
+    :return: a bytearray of card codes
     """
-    deck = []  # treating the deck as a list of cards which are either in the card_counts or a 'miss'
-    for card in card_counts:
-        cards = [card] * card_counts[card]
-        deck += cards
-    missing_cards = STARTING_DECK_SIZE - len(deck)
-    deck += ['miss']*missing_cards
+    deck = bytearray(STARTING_DECK_SIZE)  # everything is a miss until we say otherwise
+    start = 0
+    for code, card in enumerate(card_counts, start=1):
+        deck[start:start + card_counts[card]] = bytes([code]) * card_counts[card]
+        start += card_counts[card]
     return deck
 
 
+def draw_card(deck, cursor) -> int:
+    """
+    deal the card at the cursor, shuffling as we go: swap a random card from the cursor down into the cursor's slot.
+    Dealing from cursor 0 again is a fresh shuffle, and we never shuffle more of the deck than we look at
+    :param deck: a bytearray of card codes
+    :param cursor: how many cards we've dealt since the last shuffle
+    :return: the card code we drew
+    """
+    swap = cursor + int(random.random() * (len(deck) - cursor))
+    deck[cursor], deck[swap] = deck[swap], deck[cursor]
+    return deck[cursor]
+
+
 def mulligan(hand, threshold, card_counts) -> bool:
     """
     figure out if we need to mulligan
-    :param hand: our hand
+    :param hand: our hand, as a count of each card code
     :param threshold: how many of the needed cards we want before we keep a hand
     :param card_counts: a dict of cards with counts
     :return: should we mulligan or not?
@@ -39,70 +55,82 @@ def mulligan(hand, threshold, card_counts) -> bool:
     needed_cards = 0
     max_copies = max(card_counts.values())
     min_copies = min(card_counts.values())
-    for key in card_counts:
-        if key in hand:
-            needed_cards += max_copies/card_counts[key]  # how many of the needed cards do we have?
+    for code, copies in enumerate(card_counts.values(), start=1):
+        if hand[code]:
+            needed_cards += max_copies/copies  # how many of the needed cards do we have?
             #  we weight the cards by how many copies they have. For example, if we have 12 copies of one card,
             #  it counts for 1/4 as much as a card we have 3 copies of
     # if we don't have at least threshold of value combo pieces, we throw it away
     return needed_cards < threshold*max_copies/min_copies
 
 
-def resource(hand, card_counts) -> list:
-    if 'miss' in hand:  # if we have a miss, just resource that
-        hand.pop(hand.index('miss'))
+def resource(hand) -> list:
+    if hand[0]:  # if we have a miss, just resource that
+        hand[0] -= 1
         return hand
     # if we don't, we figure out the piece we have the most copies of and resource that
-    max_count = 0
-    max_card = None
-    for card in card_counts:
-        if hand.count(card) > max_count:  # we have a new largest number of copies
-            max_card = card
-            max_count = hand.count(card)
-    hand.pop(hand.index(max_card))
+    max_code = 1
+    for code in range(2, len(hand)):
+        if hand[code] > hand[max_code]:  # we have a new largest number of copies
+            max_code = code
+    hand[max_code] -= 1
     return hand
 
 
-def starting_hand(deck, threshold, card_count, mullable=True) -> tuple:
-    random.shuffle(deck)  # shuffle the deck
-    hand = deck[:6]  # draw 6
+def starting_hand(deck, hand, threshold, card_count, mullable=True) -> int:
+    """
+    deal the opening hand into hand, in place, and take the mulligan if we need it
+    :return: the cursor, where the next draw comes from
+    """
+    for code in range(len(hand)):  # empty the hand
+        hand[code] = 0
+    for cursor in range(HAND_SIZE):  # draw 6, from a fresh shuffle
+        hand[draw_card(deck, cursor)] += 1
     if mullable:  # can we take a mulligan?
         if mulligan(hand, threshold, card_count):  # should we take a mulligan?
             # start over, but without the mulligan option
-            deck, hand = starting_hand(deck, threshold, card_count, False)
+            starting_hand(deck, hand, threshold, card_count, False)
 
-    resource(hand, card_count)  # resource a card
-    resource(hand, card_count)  # and again
-    deck = deck[6:]  # remove them from the deck
-    return deck, hand
+    resource(hand)  # resource a card
+    resource(hand)  # and again
+    # after a mulligan we used to skip 6 more cards, but nobody ever saw them, so drawing on from here is the same game
+    return HAND_SIZE
 
 
-def take_turn(deck, hand, card_counts) -> tuple:
-    hand += deck[:2]  # draw 2
-    deck = deck[2:]
-    resource(hand, card_counts)  # resource a card
-    return deck, hand
+def take_turn(deck, hand, cursor) -> int:
+    hand[draw_card(deck, cursor)] += 1  # draw 2
+    hand[draw_card(deck, cursor + 1)] += 1
+    resource(hand)  # resource a card
+    return cursor + 2
 
 
-def combo_check(hand, card_counts) -> bool:
-    check_value = 0
-    for card in card_counts:  # we want at least 1 copy of each combo piece
-        if card in hand:
-            check_value += 1
-    return check_value == len(card_counts)
+def combo_check(hand) -> bool:
+    for code in range(1, len(hand)):  # we want at least 1 copy of each combo piece
+        if not hand[code]:
+            return False
+    return True
 
 
-def do_trial(n_successes, threshold, combo_cost, card_counts) -> int:
-    starting_deck = make_deck(card_counts)  # make the deck
-    deck, hand = starting_hand(starting_deck, threshold, card_counts)   # draw starting hand and do mulligan calculations
-    if combo_check(hand, card_counts):  # did we strike gold?
+def do_trial(n_successes, threshold, combo_cost, card_counts, deck=None, hand=None) -> int:
+    """
+    play one game
+    :param deck: a deck from make_deck to deal from, pass the same one in every trial to save making it again
+    :param hand: a list of len(card_counts) + 1 counts to hold the hand in, same idea
+    :return: n_successes, plus 1 if we hit the combo by combo_cost
+    """
+    if deck is None:
+        deck = make_deck(card_counts)  # make the deck
+    if hand is None:
+        hand = [0] * (len(card_counts) + 1)
+    cursor = starting_hand(deck, hand, threshold, card_counts)   # draw starting hand and do mulligan calculations
+    if combo_check(hand):  # did we strike gold?
         n_successes += 1
         return n_successes  # if so, we win
 
     current_resources = 2  # if not, let's start taking turns
     while current_resources < combo_cost:  # we're only checking up through the combo turn.
-        deck, hand = take_turn(deck, hand, card_counts)  # take a turn
-        if combo_check(hand, card_counts):  # did we win?
+        cursor = take_turn(deck, hand, cursor)  # take a turn
+        if combo_check(hand):  # did we win?
             n_successes += 1
             return n_successes
         current_resources += 1  # doing thing a little out of order, but it makes sense
@@ -113,14 +141,17 @@ def get_optimal_hold(card_counts) -> int:
     successes = []
     for hold in range(len(card_counts)+1):
         trial_successes = 0
+        deck = make_deck(card_counts)
+        hand = [0] * (len(card_counts) + 1)
         for i in range(N_TRIALS):
-            trial_successes = do_trial(trial_successes, hold, COMBO_COST, card_counts)
+            trial_successes = do_trial(trial_successes, hold, COMBO_COST, card_counts, deck, hand)
         print(f"{trial_successes} successes in {N_TRIALS} trials, a {trial_successes / N_TRIALS:.2%} hit rate with a"
               f" Threshold of {hold} for an {len(card_counts)}-card combo by turn {COMBO_COST-1}")
         successes.append(trial_successes)
     return successes.index(max(successes))
 
 
-for card_count in CARD_COUNTS:
-    get_optimal_hold(card_count)
+if __name__ == "__main__":
+    for card_count in CARD_COUNTS:
+        get_optimal_hold(card_count)
 
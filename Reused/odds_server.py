@@ -0,0 +1,216 @@
+import importlib.util
+import json
+import os
+import time
+import urllib.request
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from Reused import hypergeo_grid, top_n_card_looker
+from Reused.combo_odds import combo_odds
+
+# a long running draw odds service for deckbuilding sessions, so a quick question doesn't pay for importing scipy and
+# matplotlib and working everything out again. It keeps hypergeometric tables for the usual deck sizes in memory and
+# answers batches of JSON queries over localhost HTTP. POST a list of queries (or {"queries": [...]}) and get back
+# {"results": [...]} in the same order. A body of any other shape, or a query it can't answer, gets a 400 with
+# {"error": ...} naming the problem:
+#     {"type": "at_least", "k": 2, "copies": 9, "draws": 8, "deck_size": 50}  P(at least k copies in the top draws)
+#     {"type": "average", "max_cards": 2, "copies": 9, "draws": 8}  average copies seen, capped like top_n_card_looker
+#     {"type": "by_cost", "cost": 2, "copies": 12, "mulligan": true}  P(a copy by the turn we can pay cost)
+#     {"type": "combo", "copies": [3, 3, 3], "needed": [1, 1, 1], "draws": 8, "threshold": 1}  see combo_odds
+# run it with `python -m Reused.odds_server` from the top of the repo, and ask it things with ask()
+
+HOST = '127.0.0.1'
+PORT = 8765
+DECK_SIZES = range(40, 61)  # the deck sizes we keep tables for, anything else is worked out on the spot
+MAX_COPIES = 30
+MAX_DRAWS = 30
+CACHE_SIZE = 4096  # combo results to remember
+
+
+def load_hypergeo_calc():
+    """
+    Episode 13 isn't a package, so we load hypergeo_calc.py from its path
+    """
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Episode 13', 'hypergeo_calc.py')
+    spec = importlib.util.spec_from_file_location('hypergeo_calc', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+hypergeo_calc = load_hypergeo_calc()
+
+
+def make_tables() -> dict:
+    """
+    work out the tables once, when the server starts
+    :return: a dict of arrays indexed [deck_size - min(DECK_SIZES), copies, draws, k]: the 'pmf' of seeing exactly k,
+    the 'cdf' of seeing at most k, and the 'average' copies seen when anything past k doesn't count
+    """
+    deck_sizes = np.array(DECK_SIZES)[:, None, None, None]
+    copies = np.arange(MAX_COPIES + 1)[None, :, None, None]
+    draws = np.arange(MAX_DRAWS + 1)[None, None, :, None]
+    seen = np.arange(max(MAX_COPIES, MAX_DRAWS) + 1)
+    pmf = hypergeo_grid.pmf(seen, deck_sizes, copies, draws)
+    cdf = np.cumsum(pmf, axis=-1)
+    # the average of min(seen, k) is the sum of P(seen >= i) for i from 1 to k
+    average = np.concatenate((np.zeros(cdf.shape[:-1] + (1,)), np.cumsum(1 - cdf[..., :-1], axis=-1)), axis=-1)
+    return {'pmf': pmf, 'cdf': cdf, 'average': average}
+
+
+def in_tables(deck_size, copies, draws) -> bool:
+    return deck_size in DECK_SIZES and 0 <= copies <= MAX_COPIES and 0 <= draws <= MAX_DRAWS and draws <= deck_size
+
+
+def at_least(tables, k, copies, draws, deck_size) -> float:
+    if k <= 0:
+        return 1.0
+    if in_tables(deck_size, copies, draws):
+        seen = min(k - 1, tables['cdf'].shape[-1] - 1)
+        return float(1 - tables['cdf'][deck_size - DECK_SIZES[0], copies, draws, seen])
+    return float(1 - top_n_card_looker.get_draw_odds(draws, copies, k, deck_size))
+
+
+def average(tables, max_cards, copies, draws, deck_size) -> float:
+    if in_tables(deck_size, copies, draws) and 0 <= max_cards < tables['average'].shape[-1]:
+        return float(tables['average'][deck_size - DECK_SIZES[0], copies, draws, max_cards])
+    return float(top_n_card_looker.get_average_number_of_cards(draws, copies, max_cards, deck_size))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def cached_combo(copies, needed, deck_size, draws, hand_size, threshold) -> float:
+    return combo_odds(list(copies), list(needed), deck_size, draws, hand_size, threshold)
+
+
+def check_counts(query, deck_size) -> None:
+    """
+    make sure the copies and draws in a query fit in the deck, the tables would give back nonsense otherwise
+    :raises ValueError: naming the count that doesn't fit
+    """
+    if deck_size < 1:
+        raise ValueError(f"deck_size is {deck_size}, it has to be at least 1")
+    copies = query.get('copies', 0)
+    total_copies = sum(copies) if isinstance(copies, list) else copies
+    if min(copies if isinstance(copies, list) else [copies], default=0) < 0 or total_copies > deck_size:
+        raise ValueError(f"copies is {copies}, it has to be between 0 and deck_size ({deck_size})")
+    draws = query.get('draws', 0)
+    if not 0 <= draws <= deck_size:
+        raise ValueError(f"draws is {draws}, it has to be between 0 and deck_size ({deck_size})")
+
+
+def answer(tables, query) -> float:
+    """
+    :param tables: the tables from make_tables
+    :param query: a query dict, see the top of the file
+    :return: the answer
+    """
+    kind = query['type']
+    deck_size = query.get('deck_size', top_n_card_looker.STARTING_DECK_SIZE)
+    check_counts(query, deck_size)
+    if kind == 'at_least':
+        return at_least(tables, query['k'], query['copies'], query['draws'], deck_size)
+    if kind == 'average':
+        return average(tables, query['max_cards'], query['copies'], query['draws'], deck_size)
+    if kind == 'by_cost':
+        draws = hypergeo_calc.calc_n_draws(query['cost'])
+        if draws > deck_size:
+            raise ValueError(f"cost {query['cost']} means {draws} draws, more than deck_size ({deck_size})")
+        miss = 1 - at_least(tables, 1, query['copies'], draws, deck_size)
+        # with a mulligan we have to miss twice, like hypergeo_calc
+        return 1 - miss ** (2 if query.get('mulligan', False) else 1)
+    if kind == 'combo':
+        return cached_combo(tuple(query['copies']), tuple(query['needed']), deck_size, query['draws'],
+                            query.get('hand_size', 6), query.get('threshold'))
+    raise ValueError(f"unknown query type {kind!r}")
+
+
+def answer_batch(tables, queries) -> list:
+    """
+    :param tables: the tables from make_tables
+    :param queries: a list of query dicts
+    :return: the answers, in the same order
+    :raises ValueError: naming the first query we can't answer
+    """
+    results = []
+    for index, query in enumerate(queries):
+        try:
+            results.append(answer(tables, query))
+        except (KeyError, TypeError, ValueError, IndexError) as error:
+            raise ValueError(f"query {index}: {type(error).__name__}: {error}") from error
+    return results
+
+
+def read_queries(body) -> list:
+    """
+    :param body: the decoded JSON body of a request
+    :return: the list of queries, from a bare list or a dict holding one under 'queries'
+    :raises ValueError: if the body is any other shape
+    """
+    queries = body.get('queries') if isinstance(body, dict) else body
+    if not isinstance(queries, list):
+        raise ValueError('expected a list of queries or {"queries": [...]}')
+    return queries
+
+
+def make_handler(tables):
+    class OddsHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            start = time.perf_counter()
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except json.JSONDecodeError as error:
+                self.reply(400, {'error': f"bad JSON: {error}"})
+                return
+            try:
+                results = answer_batch(tables, read_queries(body))
+            except ValueError as error:
+                self.reply(400, {'error': str(error)})
+                return
+            self.reply(200, {'results': results, 'seconds': time.perf_counter() - start})
+
+        def reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):  # keep the terminal quiet, there's a request every few seconds
+            pass
+
+    return OddsHandler
+
+
+def serve(host=HOST, port=PORT) -> None:
+    """
+    start the server and answer queries until we're interrupted
+    """
+    tables = make_tables()
+    server = ThreadingHTTPServer((host, port), make_handler(tables))
+    print(f"answering draw odds queries on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def ask(queries, host=HOST, port=PORT) -> list:
+    """
+    send a batch of queries to a running server
+    :param queries: a list of query dicts, see the top of the file
+    :return: a list of answers, in the same order
+    """
+    request = urllib.request.Request(f"http://{host}:{port}", data=json.dumps(queries).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())['results']
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,237 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Reused import result_cache
+from Reused.batch_combo_calc import combo_spec, N_TRIALS
+from Reused.draw_engine import first_hit_histogram, hits_by_cost, info_spec, run_first_hits, ENGINE_VERSION
+
+# this runs the batch draw engine across a pool of processes. Trials get cut into fixed-size chunks and every chunk
+# gets its own random stream, built from the seed and the chunk's index. Which worker runs a chunk doesn't matter,
+# so a fixed seed gives the same answer with 1 worker or 32, and the same answer as a serial run.
+# It also means a run with more trials is the same run with more chunks on the end, so with a cache_dir the chunks we've
+# already played get read back from result_cache instead of played again
+
+CHUNK_SIZE = 10000  # trials per chunk. Changing this changes which random numbers each trial sees
+
+
+def chunk_sizes(n_trials, chunk_size=CHUNK_SIZE) -> list:
+    """
+    cut a number of trials into chunks
+    :param n_trials: the total number of trials
+    :param chunk_size: the most trials in one chunk
+    :return: a list of chunk sizes, all chunk_size except maybe the last
+    """
+    full_chunks, leftover = divmod(n_trials, chunk_size)
+    return [chunk_size] * full_chunks + ([leftover] if leftover else [])
+
+
+def make_seed(seed=None, *key) -> np.random.SeedSequence:
+    """
+    make the SeedSequence for one piece of a run. The same seed and key always give the same stream, and different
+    keys give independent streams, so we never have to worry about what order things get spawned in
+    :param seed: an int, a SeedSequence, or None for fresh entropy
+    :param key: ints that pick out a piece of the run, e.g. (threshold, chunk)
+    :return: a SeedSequence
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + tuple(key))
+
+
+def map_jobs(fn, jobs, n_workers=1, executor=None) -> list:
+    """
+    run fn on every job, in this process or across a pool. Every job carries its own seed (see make_seed), so the
+    results don't depend on which worker ran what
+    :param fn: a function of one job. It has to live at the top level of a module, so the process pool can pickle it
+    :param jobs: a list of jobs for fn
+    :param n_workers: how many processes to use, 1 runs everything here
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :return: a list of results, in the same order as the jobs
+    """
+    if executor is not None:
+        return list(executor.map(fn, jobs))
+    if n_workers == 1:
+        return [fn(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(fn, jobs))
+
+
+def run_chunk(job) -> np.ndarray:
+    """
+    run one chunk of trials
+    :param job: a tuple of (seed_sequence, n_trials, spec, combo_cost)
+    :return: the chunk's first hit histogram, see draw_engine.first_hit_histogram. The last entry is the misses
+    """
+    seed_sequence, n_trials, spec, combo_cost = job
+    rng = np.random.default_rng(seed_sequence)
+    first_hits = run_first_hits(spec, combo_cost, n_trials, rng)
+    return first_hit_histogram(first_hits, spec, combo_cost)
+
+
+def run_chunks(jobs, n_workers=1, executor=None) -> list:
+    """
+    run a list of chunk jobs, in this process or across a pool
+    :param jobs: a list of jobs for run_chunk
+    :param n_workers: how many processes to use, 1 runs everything here
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :return: a list of results, in the same order as the jobs
+    """
+    return map_jobs(run_chunk, jobs, n_workers, executor)
+
+
+def make_jobs(spec, combo_cost, n_trials, seed) -> list:
+    """
+    make the chunk jobs for one (spec, combo_cost) cell
+    :param seed: the SeedSequence for this cell, every chunk gets a child of it
+    :return: a list of jobs for run_chunk
+    """
+    return [(make_seed(seed, i), size, spec, combo_cost) for i, size in enumerate(chunk_sizes(n_trials))]
+
+
+def run_cells(cells, n_workers=1, executor=None, cache_dir=None) -> list:
+    """
+    run several (spec, combo_cost) cells through the pool together, reusing any chunks in the cache
+    :param cells: a list of (spec, combo_cost, n_trials, seed) tuples, the seed being an int or SeedSequence
+    :param n_workers: how many processes to use
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :param cache_dir: a result_cache folder, or None to always play every chunk. Only worth it with fixed seeds
+    :return: a list of merged first hit histograms, one per cell
+    """
+    plans = []
+    jobs = []
+    for spec, combo_cost, n_trials, seed in cells:
+        seed = make_seed(seed)
+        sizes = chunk_sizes(n_trials)
+        key = result_cache.make_key('first_hits', [spec, combo_cost, seed, CHUNK_SIZE, ENGINE_VERSION])
+        cached = result_cache.load_chunks(cache_dir, key, sizes) if cache_dir else []
+        cell_jobs = make_jobs(spec, combo_cost, n_trials, seed)[len(cached):]
+        plans.append((key, sizes, cached, len(cell_jobs)))
+        jobs += cell_jobs
+    results = run_chunks(jobs, n_workers, executor) if jobs else []
+    histograms = []
+    start = 0
+    for key, sizes, cached, n_jobs in plans:
+        chunks = cached + results[start:start + n_jobs]
+        start += n_jobs
+        if cache_dir and n_jobs:
+            result_cache.save_chunks(cache_dir, key, sizes, chunks, CHUNK_SIZE)
+        histograms.append(sum(chunks))
+    return histograms
+
+
+def spec_histogram(spec, combo_cost, n_trials=N_TRIALS, seed=None, n_workers=1, executor=None,
+                   cache_dir=None) -> np.ndarray:
+    """
+    the sharded version of draw_engine.first_hit_histogram over run_first_hits. One pass up to combo_cost gives the
+    hits by every earlier resource too, see draw_engine.hits_by_cost
+    :param spec: a deck spec, see draw_engine.make_spec
+    :param combo_cost: the furthest resource we play up to
+    :param n_trials: how many games to simulate
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param n_workers: how many processes to use
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :param cache_dir: a result_cache folder, or None to skip the cache
+    :return: the merged first hit histogram
+    """
+    return run_cells([(spec, combo_cost, n_trials, seed)], n_workers, executor, cache_dir)[0]
+
+
+def first_hit_histogram_sharded(card_counts, threshold, combo_cost, n_trials=N_TRIALS, seed=None, n_workers=1,
+                                executor=None, cache_dir=None, **deck_kwargs) -> np.ndarray:
+    """
+    spec_histogram for mc_combo_calc's game
+    :param card_counts: a dictionary of card names and counts
+    :param threshold: the mulligan threshold
+    :param deck_kwargs: deck_size, hand_size and mullable, see batch_combo_calc.combo_spec
+    :return: the merged first hit histogram
+    """
+    return spec_histogram(combo_spec(card_counts, threshold, **deck_kwargs), combo_cost, n_trials, seed, n_workers,
+                          executor, cache_dir)
+
+
+def count_successes(card_counts, threshold, combo_cost, n_trials=N_TRIALS, seed=None, n_workers=1, executor=None,
+                    cache_dir=None, **deck_kwargs) -> int:
+    """
+    the sharded version of summing batch_combo_calc.do_trials, see first_hit_histogram_sharded
+    :return: the number of successes
+    """
+    histogram = first_hit_histogram_sharded(card_counts, threshold, combo_cost, n_trials, seed, n_workers, executor,
+                                            cache_dir, **deck_kwargs)
+    return int(histogram[:-1].sum())
+
+
+def get_optimal_hold(card_counts, combo_cost, n_trials=N_TRIALS, seed=None, n_workers=1, cache_dir=None) -> int:
+    """
+    the sharded version of mc_combo_calc.get_optimal_hold. Every threshold gets its own branch of the seed, and all the
+    thresholds go through the pool together
+    :param card_counts: a dictionary of card names and counts
+    :param combo_cost: the resource we need to combo by
+    :param n_trials: how many games to simulate per threshold
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param n_workers: how many processes to use
+    :param cache_dir: a result_cache folder, or None to skip the cache
+    :return: the threshold with the most successes
+    """
+    seed = make_seed(seed)
+    holds = range(len(card_counts) + 1)
+    cells = [(combo_spec(card_counts, hold), combo_cost, n_trials, make_seed(seed, hold)) for hold in holds]
+    successes = []
+    for hold, histogram in zip(holds, run_cells(cells, n_workers, cache_dir=cache_dir)):
+        trial_successes = int(histogram[:-1].sum())
+        print(f"{trial_successes} successes in {n_trials} trials, a {trial_successes / n_trials:.2%} hit rate with a"
+              f" Threshold of {hold} for an {len(card_counts)}-card combo by turn {combo_cost-1}")
+        successes.append(trial_successes)
+    return successes.index(max(successes))
+
+
+def calc_odds(deck_info, n_cards, resources, n_trials=N_TRIALS, seed=None, n_workers=1, executor=None,
+              cache_dir=None) -> int:
+    """
+    the sharded version of calc_odds from Episode 30/deck_size_comparison.py
+    :param deck_info: a dict with the deck 'size', 'hand' size and whether we can 'mull', see draw_engine.info_spec
+    :param n_cards: number of cards of the type we care about
+    :param resources: the resource we need to see a copy by
+    :param n_trials: how many games to simulate
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param n_workers: how many processes to use
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :param cache_dir: a result_cache folder, or None to skip the cache
+    :return: the number of games where we saw a copy
+    """
+    histogram = spec_histogram(info_spec(deck_info, n_cards), resources, n_trials, seed, n_workers, executor,
+                               cache_dir)
+    hits = int(histogram[:-1].sum())
+    print(f"Hit {hits} times in {n_trials} with {n_cards} cards in {deck_info['label']}-deck "
+          f"{resources-1}")
+    return hits
+
+
+def calc_curve(deck_info, n_cards, max_resources, n_trials=N_TRIALS, seed=None, n_workers=1, executor=None,
+               cache_dir=None) -> list:
+    """
+    calc_odds for every resource from 2 up to max_resources, from one pass of n_trials games
+    :param deck_info: a dict with the deck 'size', 'hand' size and whether we can 'mull', see draw_engine.info_spec
+    :param n_cards: number of cards of the type we care about
+    :param max_resources: the furthest resource we want odds for
+    :param n_trials: how many games to simulate
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param n_workers: how many processes to use
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :param cache_dir: a result_cache folder, or None to skip the cache
+    :return: a list of the number of games where we saw a copy by each resource, starting at 2
+    """
+    histogram = spec_histogram(info_spec(deck_info, n_cards), max_resources, n_trials, seed, n_workers, executor,
+                               cache_dir)
+    hits = [int(hit) for hit in hits_by_cost(histogram)]
+    print(f"Hit {hits} times in {n_trials} with {n_cards} cards in {deck_info['label']}-deck by turns "
+          f"1-{max_resources-1}")
+    return hits
+
+
+if __name__ == "__main__":
+    from Reused.mc_combo_calc import CARD_COUNTS, COMBO_COST
+
+    for card_count in CARD_COUNTS:
+        get_optimal_hold(card_count, COMBO_COST, seed=0, n_workers=os.cpu_count())
@@ -0,0 +1,108 @@
+import itertools
+import math
+import os
+
+import numpy as np
+
+from Reused.adaptive_mc import describe, make_estimate, make_pool
+from Reused.batch_combo_calc import combo_spec, N_TRIALS
+from Reused.parallel_runner import chunk_sizes, make_seed, run_chunks
+
+# get_optimal_hold only tries the mulligan threshold, and gives every threshold the full N_TRIALS. This searches a
+# whole space of policies (how we mulligan and what we resource first) with successive halving: every policy gets a
+# few thousand trials, the best 1/ETA of them get ETA times as many, and so on until the survivors have had the full
+# budget. Every policy plays the same shuffles chunk for chunk, so the cuts compare policies on the same games
+
+FIRST_RUNG = 2000  # trials every policy gets before the first cut, and the size of every chunk
+ETA = 3  # keep the best 1/ETA of the policies at each cut
+
+
+def policy_space(card_counts) -> list:
+    """
+    every policy we want to try for a combo
+    :param card_counts: a dictionary of card names and counts
+    :return: a list of policy dicts, each one a set of deck spec values, see draw_engine.DECK_SPEC
+    """
+    pieces = list(card_counts)
+    # the usual weighted thresholds, plus "only keep a hand with this piece in it"
+    mulligan_rules = [{'threshold': hold, 'mulligan_weights': None} for hold in range(len(pieces) + 1)]
+    mulligan_rules += [{'threshold': 1, 'mulligan_weights': {piece: 1}} for piece in pieces]
+    # the most copies rule, or a fixed order of which piece we give up first
+    resource_rules = [{'resource_order': None}]
+    resource_rules += [{'resource_order': order} for order in itertools.permutations(pieces)]
+    return [{**mulligan_rule, **resource_rule} for mulligan_rule in mulligan_rules for resource_rule in resource_rules]
+
+
+def describe_policy(policy) -> str:
+    if policy['mulligan_weights'] is None:
+        text = f"Threshold of {policy['threshold']}"
+    else:
+        text = f"keep with {' or '.join(policy['mulligan_weights'])}"
+    if policy['resource_order'] is not None:
+        text += f", resourcing {' then '.join(policy['resource_order'])}"
+    return text
+
+
+def successive_halving(base_spec, combo_cost, policies, seed=None, first_rung=FIRST_RUNG, eta=ETA,
+                       max_trials=N_TRIALS, n_workers=1) -> list:
+    """
+    race a list of policies against each other, cutting the worst ones as we go
+    :param base_spec: the deck spec every policy is played on
+    :param combo_cost: the resource we need to hit by
+    :param policies: a list of policy dicts, see policy_space
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param first_rung: trials every policy gets before the first cut
+    :param eta: keep the best 1/eta at each cut, and give them eta times the trials
+    :param max_trials: the trials the last policies standing get
+    :param n_workers: how many processes to use
+    :return: a list of (policy, estimate) pairs for every policy, the ones that lasted longest and hit most first
+    """
+    seed = make_seed(seed)
+    successes = np.zeros(len(policies), dtype=int)
+    trials = np.zeros(len(policies), dtype=int)
+    alive = list(range(len(policies)))
+    rung_trials = first_rung
+    n_chunks = 0
+    with make_pool(n_workers) as pool:
+        while True:
+            sizes = chunk_sizes(min(rung_trials, max_trials) - trials[alive[0]], first_rung)
+            # chunk i is the same shuffles for every policy, so policies are compared on the same games
+            jobs = [(make_seed(seed, n_chunks + i), size, {**base_spec, **policies[policy]}, combo_cost)
+                    for policy in alive for i, size in enumerate(sizes)]
+            results = run_chunks(jobs, n_workers, pool)
+            for job_index, histogram in enumerate(results):
+                policy = alive[job_index // len(sizes)]
+                successes[policy] += histogram[:-1].sum()
+                trials[policy] += jobs[job_index][1]
+            n_chunks += len(sizes)
+            if trials[alive[0]] >= max_trials:
+                break
+            alive = sorted(alive, key=lambda policy: -successes[policy])[:max(math.ceil(len(alive) / eta), 1)]
+            rung_trials *= eta
+    ranking = sorted(range(len(policies)), key=lambda policy: (-trials[policy], -successes[policy]))
+    return [(policies[policy], make_estimate(int(successes[policy]), int(trials[policy]))) for policy in ranking]
+
+
+def get_optimal_policy(card_counts, combo_cost, seed=None, first_rung=FIRST_RUNG, eta=ETA, max_trials=N_TRIALS,
+                       n_workers=1, **deck_kwargs) -> dict:
+    """
+    the policy search version of mc_combo_calc.get_optimal_hold
+    :param card_counts: a dictionary of card names and counts
+    :param combo_cost: the resource we need to combo by
+    :param deck_kwargs: deck_size, hand_size and mullable, see batch_combo_calc.combo_spec
+    :return: the best policy dict, see successive_halving for the other parameters
+    """
+    ranking = successive_halving(combo_spec(card_counts, 1, **deck_kwargs), combo_cost, policy_space(card_counts),
+                                 seed, first_rung, eta, max_trials, n_workers)
+    for policy, estimate in ranking[:eta]:
+        print(f"{describe(estimate)} with a {describe_policy(policy)} for an {len(card_counts)}-card combo"
+              f" by turn {combo_cost-1}")
+    print(f"({len(ranking)} policies tried, {sum(estimate['trials'] for _, estimate in ranking)} trials in all)")
+    return ranking[0][0]
+
+
+if __name__ == "__main__":
+    from Reused.mc_combo_calc import CARD_COUNTS, COMBO_COST
+
+    for card_count in CARD_COUNTS:
+        get_optimal_policy(card_count, COMBO_COST, seed=0, n_workers=os.cpu_count())
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# an on-disk cache for simulation and probability results, so re-running a plot doesn't redo all the work.
+# Results are stored under a hash of everything that decides them: the kind of run, its parameters (deck spec,
+# threshold, seed...) and the engine version, so a change to any of those is just a different key. The cache is kept
+# under a size cap by throwing away whatever was used least recently. Monte Carlo runs are stored chunk by chunk, so a
+# bigger run with the same seed only has to play the chunks we haven't seen yet, see parallel_runner.spec_histogram.
+# Only full chunks are kept, so a shorter run can't overwrite a longer one
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.result_cache')
+MAX_BYTES = 500 * 2**20  # keep the cache under 500MB
+
+
+def canonical(value):
+    """
+    turn parameters into something json can write the same way every time
+    :param value: a dict, list, SeedSequence, numpy value, function or plain value. Functions are keyed on their code,
+    defaults and closure as well as their name
+    :return: a json-friendly version of value
+    """
+    if isinstance(value, dict):
+        # keep dicts as lists of pairs, since the order of a spec's pieces changes the game
+        return [[canonical(key), canonical(item)] for key, item in value.items()]
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, np.random.SeedSequence):
+        return {'entropy': str(value.entropy), 'spawn_key': list(value.spawn_key)}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, '__code__'):
+        # a name alone would give every lambda the same key, and keep the key when a function's body changes
+        return {'function': f"{value.__module__}.{value.__qualname__}", 'code': code_digest(value.__code__),
+                'defaults': canonical(value.__defaults__ or ()),
+                'kwdefaults': canonical(value.__kwdefaults__ or {}),
+                'closure': canonical([cell.cell_contents for cell in value.__closure__ or ()])}
+    if callable(value):
+        return f"{value.__module__}.{value.__qualname__}"
+    return value
+
+
+def code_digest(code) -> str:
+    """
+    :param code: a function's code object
+    :return: a hex digest of its bytecode, constants and the names it looks up, nested functions included
+    """
+    digest = hashlib.sha256(code.co_code)
+    for const in code.co_consts:
+        digest.update((code_digest(const) if hasattr(const, 'co_code') else repr(const)).encode())
+    digest.update(repr(code.co_names).encode())
+    return digest.hexdigest()
+
+
+def make_key(kind, params) -> str:
+    """
+    :param kind: what sort of result this is, e.g. 'first_hits'
+    :param params: everything the result depends on, including an engine version
+    :return: a hex digest naming the result
+    """
+    text = json.dumps([kind, canonical(params)], sort_keys=True, default=repr)  # anything else, e.g. in a closure
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def cache_path(cache_dir, key) -> str:
+    return os.path.join(cache_dir, f'{key}.npz')
+
+
+def load(cache_dir, key):
+    """
+    read a cached result, and mark it as just used
+    :param cache_dir: the cache folder
+    :param key: the result's key, see make_key
+    :return: a dict of arrays, or None if we don't have it
+    """
+    path = cache_path(cache_dir, key)
+    try:
+        with np.load(path) as stored:
+            arrays = {name: stored[name] for name in stored.files}
+    except (FileNotFoundError, OSError, ValueError):  # missing, or half written by a run that got killed
+        return None
+    os.utime(path)  # the modified time doubles as the last used time
+    return arrays
+
+
+def save(cache_dir, key, max_bytes=MAX_BYTES, **arrays) -> None:
+    """
+    write a result to the cache, then trim the cache back under max_bytes
+    :param cache_dir: the cache folder
+    :param key: the result's key, see make_key
+    :param max_bytes: how big the cache folder can get
+    :param arrays: the arrays to store
+    :return: None
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(cache_dir, key)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(temp_path, path)  # so another process never reads half a file
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir, max_bytes=MAX_BYTES) -> None:
+    """
+    delete the least recently used results until the cache is at most max_bytes
+    :param cache_dir: the cache folder
+    :param max_bytes: how big the cache folder can get
+    :return: None
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.npz'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:  # someone else already evicted it
+            pass
+        total -= size
+
+
+def cached_array(cache_dir, kind, params, compute) -> np.ndarray:
+    """
+    get a deterministic result from the cache, or compute it and store it
+    :param cache_dir: the cache folder, None to skip the cache
+    :param kind: what sort of result this is
+    :param params: everything the result depends on
+    :param compute: a function with no arguments that makes the result
+    :return: the result, as an array
+    """
+    if cache_dir is None:
+        return np.asarray(compute())
+    key = make_key(kind, params)
+    stored = load(cache_dir, key)
+    if stored is not None:
+        return stored['result']
+    result = np.asarray(compute())
+    save(cache_dir, key, result=result)
+    return result
+
+
+def load_chunks(cache_dir, key, sizes) -> list:
+    """
+    get the chunk results we already have for a chunked Monte Carlo run
+    :param cache_dir: the cache folder
+    :param key: the run's key, which covers everything but the number of trials
+    :param sizes: the chunk sizes the run needs, see parallel_runner.chunk_sizes
+    :return: a list of cached chunk results, the longest prefix of sizes that we have
+    """
+    stored = load(cache_dir, key)
+    if stored is None:
+        return []
+    chunks = []
+    # a short last chunk of a smaller run can't stand in for a full chunk of a bigger one
+    for size, stored_size, result in zip(sizes, stored['sizes'], stored['results']):
+        if size != stored_size:
+            break
+        chunks.append(result)
+    return chunks
+
+
+def save_chunks(cache_dir, key, sizes, results, chunk_size) -> None:
+    """
+    store the full chunks of a chunked Monte Carlo run, unless we already have at least as many. A short last chunk is
+    left out, so a smaller run never cuts down what a bigger one stored
+    :param cache_dir: the cache folder
+    :param key: the run's key
+    :param sizes: the size of every chunk
+    :param results: one result array per chunk, all the same shape
+    :param chunk_size: the size of a full chunk
+    :return: None
+    """
+    full = count_full(sizes, chunk_size)
+    if not full:
+        return
+    stored = load(cache_dir, key)
+    if stored is not None and count_full(stored['sizes'], chunk_size) >= full:
+        return
+    save(cache_dir, key, sizes=np.array(sizes[:full]), results=np.array(results[:full]))
+
+
+def count_full(sizes, chunk_size) -> int:
+    """
+    :return: how many chunks at the start of sizes are full ones
+    """
+    full = 0
+    for size in sizes:
+        if size != chunk_size:
+            break
+        full += 1
+    return full
@@ -0,0 +1,150 @@
+import numpy as np
+
+# fixed memory summaries of a stream of samples, for simulations too big to keep every sample from. An accumulator is
+# a dict holding a histogram (counts in fixed bins, plus how many samples fell below and above them) and the running
+# count, mean and sum of squared deviations, updated a batch of samples at a time. Two accumulators with the same bins
+# merge exactly, so every worker in a process pool can fill its own and we add them up at the end. Quantiles come out
+# of the histogram, so they're only as fine as the bins
+
+DEFAULT_BINS = 200
+
+
+def make_accumulator(low, high, n_bins=DEFAULT_BINS) -> dict:
+    """
+    :param low: the bottom of the first bin
+    :param high: the top of the last bin
+    :param n_bins: how many equal bins to split [low, high) into. For whole number samples, low=-.5, high=n-.5 and
+    n_bins=n gives a bin per number
+    :return: an empty accumulator
+    """
+    return {'edges': np.linspace(low, high, n_bins + 1), 'counts': np.zeros(n_bins, dtype=np.int64), 'below': 0,
+            'above': 0, 'n': 0, 'mean': 0.0, 'm2': 0.0}
+
+
+def add_samples(accumulator, samples) -> dict:
+    """
+    add a batch of samples to an accumulator, in place
+    :param accumulator: an accumulator from make_accumulator
+    :param samples: an array of samples, any shape
+    :return: the accumulator
+    """
+    samples = np.asarray(samples, dtype=float).ravel()
+    if not len(samples):
+        return accumulator
+    edges = accumulator['edges']
+    n_bins = len(edges) - 1
+    bins = np.floor((samples - edges[0]) / (edges[-1] - edges[0]) * n_bins).astype(np.int64)
+    inside = (bins >= 0) & (bins < n_bins)
+    accumulator['counts'] += np.bincount(bins[inside], minlength=n_bins)
+    accumulator['below'] += int((bins < 0).sum())
+    accumulator['above'] += int((bins >= n_bins).sum())
+    batch = {'n': len(samples), 'mean': samples.mean(), 'm2': ((samples - samples.mean()) ** 2).sum()}
+    accumulator.update(merge_moments(accumulator, batch))
+    return accumulator
+
+
+def add_counts(accumulator, values, counts) -> dict:
+    """
+    add samples that are already counted up, e.g. a bincount, in place
+    :param accumulator: an accumulator from make_accumulator
+    :param values: an array of sample values
+    :param counts: how many times each value came up
+    :return: the accumulator
+    """
+    values = np.asarray(values, dtype=float)
+    counts = np.asarray(counts, dtype=np.int64)
+    n = int(counts.sum())
+    if not n:
+        return accumulator
+    edges = accumulator['edges']
+    n_bins = len(edges) - 1
+    bins = np.floor((values - edges[0]) / (edges[-1] - edges[0]) * n_bins).astype(np.int64)
+    inside = (bins >= 0) & (bins < n_bins)
+    accumulator['counts'] += np.bincount(bins[inside], weights=counts[inside], minlength=n_bins).astype(np.int64)
+    accumulator['below'] += int(counts[bins < 0].sum())
+    accumulator['above'] += int(counts[bins >= n_bins].sum())
+    mean = values @ counts / n
+    batch = {'n': n, 'mean': mean, 'm2': ((values - mean) ** 2) @ counts}
+    accumulator.update(merge_moments(accumulator, batch))
+    return accumulator
+
+
+def merge_moments(first, second) -> dict:
+    """
+    combine the count, mean and sum of squared deviations of two sets of samples (Chan et al.'s parallel update)
+    :return: a dict of the combined 'n', 'mean' and 'm2'
+    """
+    n = first['n'] + second['n']
+    if not n:
+        return {'n': 0, 'mean': 0.0, 'm2': 0.0}
+    delta = second['mean'] - first['mean']
+    return {'n': n, 'mean': first['mean'] + delta * second['n'] / n,
+            'm2': first['m2'] + second['m2'] + delta ** 2 * first['n'] * second['n'] / n}
+
+
+def merge(first, second) -> dict:
+    """
+    :return: a new accumulator with the samples of both, which need the same bins
+    """
+    if not np.array_equal(first['edges'], second['edges']):
+        raise ValueError("can't merge accumulators with different bins")
+    return {'edges': first['edges'], 'counts': first['counts'] + second['counts'],
+            'below': first['below'] + second['below'], 'above': first['above'] + second['above'],
+            **merge_moments(first, second)}
+
+
+def merge_all(accumulators) -> dict:
+    """
+    merge a list of accumulators, e.g. one from each worker
+    """
+    merged = accumulators[0]
+    for accumulator in accumulators[1:]:
+        merged = merge(merged, accumulator)
+    return merged
+
+
+def variance(accumulator) -> float:
+    return accumulator['m2'] / accumulator['n'] if accumulator['n'] else np.nan
+
+
+def quantiles(accumulator, qs) -> np.ndarray:
+    """
+    approximate quantiles, spreading each bin's samples evenly across it. Samples below or above the bins count as
+    being on the edge
+    :param accumulator: an accumulator from make_accumulator
+    :param qs: a number or array of quantiles, between 0 and 1
+    :return: the quantiles, in the same shape as qs
+    """
+    edges, counts = accumulator['edges'], accumulator['counts']
+    cumulative = accumulator['below'] + np.cumsum(counts)  # samples up to the top of each bin
+    targets = np.asarray(qs, dtype=float) * accumulator['n']
+    bins = np.minimum(np.searchsorted(cumulative, targets, side='left'), len(counts) - 1)
+    below_bin = cumulative[bins] - counts[bins]
+    share = np.clip((targets - below_bin) / np.maximum(counts[bins], 1), 0, 1)
+    return edges[bins] + share * (edges[bins + 1] - edges[bins])
+
+
+def summary(accumulator, qs=(.05, .5, .95)) -> dict:
+    """
+    :return: a dict of the 'n', 'mean', 'std' and a 'q<quantile>' entry for each of qs
+    """
+    result = {'n': accumulator['n'], 'mean': accumulator['mean'], 'std': np.sqrt(variance(accumulator))}
+    for q, value in zip(qs, quantiles(accumulator, qs)):
+        result[f'q{q:g}'] = value
+    return result
+
+
+def hist_args(accumulator, trim=True) -> dict:
+    """
+    the arguments to redraw the histogram with plt.hist, e.g. plt.hist(**hist_args(accumulator), histtype='step')
+    :param accumulator: an accumulator from make_accumulator
+    :param trim: leave off the empty bins at either end, like plt.hist does with a list of samples
+    :return: a dict of 'x', 'bins' and 'weights'
+    """
+    edges, counts = accumulator['edges'], accumulator['counts']
+    first, last = 0, len(counts)
+    if trim and counts.any():
+        occupied = np.flatnonzero(counts)
+        first, last = occupied[0], occupied[-1] + 1
+    centers = (edges[first:last] + edges[first + 1:last + 1]) / 2
+    return {'x': centers, 'bins': edges[first:last + 1], 'weights': counts[first:last]}
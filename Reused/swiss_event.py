@@ -0,0 +1,239 @@
+import numpy as np
+
+from Reused import streaming_stats, swiss_pairing
+from Reused.parallel_runner import chunk_sizes, make_seed, map_jobs
+from Reused.swiss_sim import make_field, make_game_odds, set_win_odds
+
+# a big Swiss event (a Regional or a Galactic Championship, thousands of players) played out one tournament at a time,
+# with the things swiss_sim leaves out: byes for an odd field, players dropping as the losses pile up, intentional draws
+# in the last rounds for pairings the draw locks into the cut, tiebreakers and a single elimination top cut.
+# Every player is an entry in a handful of arrays, a round is one lexsort for the standings, a vectorized pairing down
+# them with no rematches (see swiss_pairing), and one random draw for every set. run_events plays lots of events across
+# a process pool, every event with its own seed, and keeps fixed size summaries of them
+
+WIN_POINTS = 3
+DRAW_POINTS = 1
+OMW_FLOOR = 1 / 3  # nobody's match win % counts as less than this in their opponents' tiebreakers
+CUT_SIZE = 8
+ID_ROUNDS = 2  # the last rounds where players at the top tables will take an intentional draw
+DROP_ODDS = (0, 0, .05, .15, .25)  # the chance a player still in drops after a round, by how many losses they have
+N_EVENTS = 1000
+
+
+def make_event(decks, n_rounds) -> dict:
+    """
+    :param decks: an array of which deck every player is on
+    :param n_rounds: rounds of Swiss
+    :return: a blank event
+    """
+    n_players = len(decks)
+    return {'decks': decks,
+            'points': np.zeros(n_players, dtype=np.int32),
+            'wins': np.zeros(n_players, dtype=np.int32),
+            'losses': np.zeros(n_players, dtype=np.int32),
+            'draws': np.zeros(n_players, dtype=np.int32),
+            'had_bye': np.zeros(n_players, dtype=bool),
+            'took_id': np.zeros(n_players, dtype=bool),
+            'active': np.ones(n_players, dtype=bool),
+            'opponents': np.full((n_players, n_rounds), swiss_pairing.NO_OPPONENT, dtype=np.int32),
+            'round': 0}
+
+
+def opponent_match_win_percent(event) -> np.ndarray:
+    """
+    every player's opponents' average match win %, each floored at OMW_FLOOR. Byes don't count as opponents
+    """
+    played = np.maximum(event['wins'] + event['losses'] + event['draws'], 1)
+    match_win_percent = np.maximum(event['points'] / (WIN_POINTS * played), OMW_FLOOR)
+    opponents = event['opponents'][:, :event['round']]
+    real = opponents != swiss_pairing.NO_OPPONENT
+    total = np.where(real, match_win_percent[np.maximum(opponents, 0)], 0).sum(axis=1)
+    return total / np.maximum(real.sum(axis=1), 1)
+
+
+def standings(event, rng, players=None) -> np.ndarray:
+    """
+    :param event: an event
+    :param rng: a numpy Generator, for ties that get past the tiebreakers
+    :param players: the players to rank, every player still in by default
+    :return: an array of player numbers, best first: points, then opponents' match win %, then at random
+    """
+    if players is None:
+        players = np.flatnonzero(event['active'])
+    omw = opponent_match_win_percent(event)[players]
+    return players[np.lexsort((rng.random(len(players)), -omw, -event['points'][players]))]
+
+
+def give_bye(event, order) -> np.ndarray:
+    """
+    if there's an odd number of players, the lowest ranked player who hasn't had a bye gets one, a free match win. If
+    everyone still in has already had a bye (only possible once the field is down to a handful), the lowest ranked
+    player gets a second one, the way a tournament organizer would hand it out
+    :param order: the standings of the players still in
+    :return: the standings without the player with the bye
+    """
+    if len(order) % 2 == 0:
+        return order
+    no_bye_yet = np.flatnonzero(~event['had_bye'][order])
+    position = no_bye_yet[-1] if len(no_bye_yet) else len(order) - 1  # everyone's had one, the last player gets another
+    player = order[position]
+    event['had_bye'][player] = True
+    event['points'][player] += WIN_POINTS
+    event['wins'][player] += 1
+    return np.delete(order, position)
+
+
+def record_results(event, player1, player2, player1_points, player2_points) -> None:
+    for player, opponent, points in ((player1, player2, player1_points), (player2, player1, player2_points)):
+        event['opponents'][player, event['round']] = opponent
+        event['points'][player] += points
+        event['wins'][player] += points == WIN_POINTS
+        event['draws'][player] += points == DRAW_POINTS
+        event['losses'][player] += points == 0
+
+
+def locked_in(event, n_rounds, cut_size) -> np.ndarray:
+    """
+    which players are sure to make the top cut even if they draw every round left. That's when their points after all
+    those draws beat what the (cut_size + 1)th player could reach by winning out, so no more than cut_size - 1 others
+    can catch them, tiebreakers or not
+    :return: a bool array, one per player
+    """
+    rounds_left = n_rounds - event['round']
+    best_case = np.sort(event['points'][event['active']] + WIN_POINTS * rounds_left)[::-1]
+    if len(best_case) <= cut_size:
+        return event['active'].copy()
+    return event['active'] & (event['points'] + DRAW_POINTS * rounds_left > best_case[cut_size])
+
+
+def play_round(event, n_rounds, set_odds, rng, cut_size=CUT_SIZE, id_rounds=ID_ROUNDS, drop_odds=DROP_ODDS) -> None:
+    """
+    pair and play one round of Swiss, then let players drop
+    :param event: an event, updated in place
+    :param n_rounds: rounds of Swiss, so we know when the last rounds are
+    :param set_odds: an (n decks x n decks) array of set win rates
+    :param rng: a numpy Generator
+    :param cut_size: how many players make the top cut
+    :param id_rounds: how many of the last rounds players will ID in, if the draws are sure to keep both of them in the
+    top cut_size, see locked_in
+    :param drop_odds: the chance a player drops after a round, by how many losses they have. Past the end of the list,
+    the last entry
+    """
+    order = give_bye(event, standings(event, rng))
+    pairs = swiss_pairing.pair_round(order[None, :], event['opponents'][None, :, :])[0]
+    player1, player2 = pairs[:, 0], pairs[:, 1]
+    player1_wins = rng.random(len(pairs)) < set_odds[event['decks'][player1], event['decks'][player2]]
+    player1_points = np.where(player1_wins, WIN_POINTS, 0)
+    player2_points = WIN_POINTS - player1_points
+    if event['round'] >= n_rounds - id_rounds:
+        # a pairing takes the draw only if drawing out can't knock either of them out of the cut
+        safe = locked_in(event, n_rounds, cut_size)
+        intentional_draw = safe[player1] & safe[player2]
+        player1_points = np.where(intentional_draw, DRAW_POINTS, player1_points)
+        player2_points = np.where(intentional_draw, DRAW_POINTS, player2_points)
+        event['took_id'][player1[intentional_draw]] = True
+        event['took_id'][player2[intentional_draw]] = True
+    record_results(event, player1, player2, player1_points, player2_points)
+    # a locked in player paired against someone who isn't still has to play, and a loss can undo the lock
+    event['took_id'][np.concatenate((player1[player1_points == 0], player2[player2_points == 0]))] = False
+    event['round'] += 1
+    if event['round'] < n_rounds:
+        odds = np.asarray(drop_odds)[np.minimum(event['losses'], len(drop_odds) - 1)]
+        event['active'] &= (rng.random(len(odds)) >= odds) | event['took_id']  # nobody drops out of a locked cut spot
+
+
+def check_cut_size(cut_size) -> None:
+    if cut_size < 1 or cut_size & (cut_size - 1):
+        raise ValueError(f"a top cut of {cut_size}, it has to be a power of 2 for single elimination")
+
+
+def play_top_cut(event, set_odds, rng, cut_size=CUT_SIZE) -> tuple:
+    """
+    single elimination between the top cut_size players (a power of 2), 1st plays last, 2nd plays second to last...
+    :return: (the players who made the cut, best seed first, the winner)
+    """
+    check_cut_size(cut_size)
+    if event['active'].sum() < cut_size:
+        raise ValueError(f"only {event['active'].sum()} players left, not enough for a top {cut_size}")
+    cut = standings(event, rng)[:cut_size]  # nobody drops after the last round, so everyone still in is eligible
+    bracket = cut
+    while len(bracket) > 1:
+        half = len(bracket) // 2
+        top, bottom = bracket[:half], bracket[::-1][:half]
+        top_wins = rng.random(half) < set_odds[event['decks'][top], event['decks'][bottom]]
+        bracket = np.where(top_wins, top, bottom)
+    return cut, bracket[0]
+
+
+def play_event(decks, set_odds, n_rounds, rng, cut_size=CUT_SIZE, id_rounds=ID_ROUNDS, drop_odds=DROP_ODDS) -> dict:
+    """
+    play one whole event, Swiss and the top cut
+    :param decks: an array of which deck every player is on
+    :param set_odds: an (n decks x n decks) array of set win rates
+    :param n_rounds: rounds of Swiss
+    :param rng: a numpy Generator
+    :return: the event, with the 'cut' and the 'winner' added
+    """
+    check_cut_size(cut_size)
+    if len(decks) < cut_size:
+        raise ValueError(f"{len(decks)} players, not enough for a top {cut_size}")
+    event = make_event(decks, n_rounds)
+    for _ in range(n_rounds):
+        play_round(event, n_rounds, set_odds, rng, cut_size, id_rounds, drop_odds)
+    event['cut'], event['winner'] = play_top_cut(event, set_odds, rng, cut_size)
+    # locked_in only lets players ID when they can't miss the cut, so anyone who drew in and didn't lose after should be
+    # in it
+    assert np.isin(np.flatnonzero(event['took_id']), event['cut']).all(), "a player who took an ID missed the cut"
+    return event
+
+
+def run_chunk(job) -> dict:
+    """
+    play some events and sum them up
+    :param job: a tuple of (seed_sequence, n_events, decks, set_odds, n_rounds, settings), settings being a dict of
+    play_event's keyword arguments
+    :return: a dict of how many times each deck made the 'top_cut' and won ('winners'), and streaming_stats
+    accumulators of the points the last player into the cut had ('cut_line') and how many players 'dropped'
+    """
+    seed_sequence, n_events, decks, set_odds, n_rounds, settings = job
+    rng = np.random.default_rng(seed_sequence)
+    n_names = len(set_odds)
+    summary = {'top_cut': np.zeros(n_names, dtype=np.int64), 'winners': np.zeros(n_names, dtype=np.int64),
+               'cut_line': streaming_stats.make_accumulator(-.5, WIN_POINTS * n_rounds + .5, WIN_POINTS * n_rounds + 1),
+               'dropped': streaming_stats.make_accumulator(0, len(decks))}
+    for _ in range(n_events):
+        event = play_event(decks, set_odds, n_rounds, rng, **settings)
+        summary['top_cut'] += np.bincount(decks[event['cut']], minlength=n_names)
+        summary['winners'][decks[event['winner']]] += 1
+        streaming_stats.add_samples(summary['cut_line'], event['points'][event['cut'][-1]])
+        streaming_stats.add_samples(summary['dropped'], (~event['active']).sum())
+    return summary
+
+
+def run_events(n_decks, matchups, n_rounds, n_events=N_EVENTS, seed=None, n_workers=1, events_per_job=10,
+               executor=None, **settings) -> dict:
+    """
+    play lots of events with the same field, across a process pool
+    :param n_decks: a dict of decks and counts, any total
+    :param matchups: a dict of deck edges or a matrix of game win rates, see swiss_sim.make_game_odds
+    :param n_rounds: rounds of Swiss
+    :param n_events: how many events to play
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param n_workers: how many processes to use, 1 runs everything here
+    :param events_per_job: events per job sent to a worker
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :param settings: cut_size, id_rounds and drop_odds, see play_round
+    :return: the summed up run_chunk summaries, plus the deck 'names', the deck 'counts' and 'n_events'. A deck's
+    conversion rate into the cut is top_cut / (counts * n_events)
+    """
+    names, decks = make_field(n_decks)
+    set_odds = set_win_odds(make_game_odds(names, matchups))
+    seed = make_seed(seed)
+    jobs = [(make_seed(seed, i), size, decks, set_odds, n_rounds, settings)
+            for i, size in enumerate(chunk_sizes(n_events, events_per_job))]
+    summaries = map_jobs(run_chunk, jobs, n_workers, executor)
+    return {'names': names, 'counts': np.bincount(decks, minlength=len(names)), 'n_events': n_events,
+            'top_cut': sum(summary['top_cut'] for summary in summaries),
+            'winners': sum(summary['winners'] for summary in summaries),
+            'cut_line': streaming_stats.merge_all([summary['cut_line'] for summary in summaries]),
+            'dropped': streaming_stats.merge_all([summary['dropped'] for summary in summaries])}
@@ -0,0 +1,169 @@
+import numpy as np
+
+from Reused.swiss_sim import make_field, make_game_odds, set_win_odds
+
+# the record distribution of a Swiss tournament worked out round by round instead of simulated. Ties can't happen, so a
+# player's record is just their wins, and the tournament moves as a Markov chain over score groups.
+# A state is how many players are on each number of wins (the group sizes), with its probability and the expected
+# number of players from every deck in each group. Inside a group everyone is paired at random, so exactly half of
+# them win, and each deck's share of the winners comes from how it does against the group's deck mix. The odd player
+# out of a group is a random member of it, and plays a random member of the next group down, the same as
+# Tourney_MC.play_round: that one match is the only thing that changes the group sizes, so the state splits in two
+# there, one branch for each winner, and states that end up with the same group sizes get merged.
+# The group sizes and their odds are exact. The deck mix of a group is only carried as its expected value, as if a
+# group's players were drawn at random from its mix, which makes the per-deck numbers a mean-field approximation.
+# They're exact only with no pairing edges and a constant win rate (every matchup the same coin flip). With edges or a
+# matchup matrix they're off by a few thousandths of a win per player (a player can't be paired against themselves,
+# the mix ignores that), so call them analytic, not exact, next to a simulation.
+# A big swiss_sim run is the check on it
+
+
+def pair_down(upper, lower, set_odds) -> tuple:
+    """
+    the odd player out of one group against a random player from the group below
+    :param upper: the upper group's deck mix, an array that adds up to 1
+    :param lower: the lower group's deck mix
+    :param set_odds: an (n decks x n decks) array of set win rates
+    :return: (the chance the upper player wins, the expected deck mix of [the upper winner, the lower loser, the upper
+    loser, the lower winner], as 4 arrays that add up to 1 each)
+    """
+    upper_beats = set_odds @ lower  # how often each upper deck beats a random lower player
+    lower_beats = (1 - set_odds).T @ upper
+    upper_wins = upper @ upper_beats
+    mixes = []
+    for chance, upper_mix, lower_mix in ((upper_wins, upper * upper_beats, lower * (1 - lower_beats)),
+                                         (1 - upper_wins, upper * (1 - upper_beats), lower * lower_beats)):
+        scale = 1 / chance if chance > 0 else 0
+        mixes += [upper_mix * scale, lower_mix * scale]
+    return upper_wins, mixes
+
+
+def play_group(mass, set_odds) -> tuple:
+    """
+    pair the players in a group (an even number of them) at random and play them
+    :param mass: the expected number of players from each deck in the group
+    :param set_odds: an (n decks x n decks) array of set win rates
+    :return: (the expected number of winners from each deck, the expected number of losers)
+    """
+    n_players = mass.sum()
+    if n_players <= 0:
+        return np.zeros_like(mass), np.zeros_like(mass)
+    win_odds = set_odds @ (mass / n_players)
+    return mass * win_odds, mass * (1 - win_odds)
+
+
+def play_state(sizes, mass, set_odds) -> list:
+    """
+    play one round from one state
+    :param sizes: a tuple of how many players are on 0, 1, ... wins
+    :param mass: an (n decks x len(sizes)) array of the expected players from each deck on each number of wins
+    :param set_odds: an (n decks x n decks) array of set win rates
+    :return: a list of (probability, sizes, mass) for the states after the round, the mass having one more column
+    """
+    n_records = len(sizes) + 1
+    branches = [(1.0, [0] * n_records, np.zeros((len(mass), n_records)))]
+    carry = None  # (wins, deck mix) of the player paired down from the group above
+    for wins in reversed(range(len(sizes))):
+        n_players = sizes[wins]
+        if not n_players:
+            continue
+        group = mass[:, wins].copy()
+        if carry is not None:
+            upper_wins, mix = pair_down(carry[1], group / n_players, set_odds)
+            new_branches = []
+            for probability, new_sizes, new_mass in branches:
+                for chance, (upper, lower), (upper_to, lower_to) in (
+                        (upper_wins, mix[:2], (carry[0] + 1, wins)), (1 - upper_wins, mix[2:], (carry[0], wins + 1))):
+                    if chance <= 0:
+                        continue
+                    branch_sizes, branch_mass = list(new_sizes), new_mass.copy()
+                    branch_sizes[upper_to] += 1
+                    branch_sizes[lower_to] += 1
+                    branch_mass[:, upper_to] += upper
+                    branch_mass[:, lower_to] += lower
+                    new_branches.append((probability * chance, branch_sizes, branch_mass))
+            branches = new_branches
+            group -= group / n_players  # whoever played up came out of the group at random
+            n_players -= 1
+            carry = None
+        if n_players % 2:
+            carry = (wins, group / n_players)
+            group -= carry[1]
+            n_players -= 1
+        winners, losers = play_group(group, set_odds)
+        for _, new_sizes, new_mass in branches:
+            new_sizes[wins + 1] += n_players // 2
+            new_sizes[wins] += n_players // 2
+            new_mass[:, wins + 1] += winners
+            new_mass[:, wins] += losers
+    if carry is not None:
+        raise ValueError("an odd number of players, we need an even number because there are no byes")
+    return [(probability, tuple(new_sizes), new_mass) for probability, new_sizes, new_mass in branches]
+
+
+def merge_states(states) -> dict:
+    """
+    :param states: a list of (probability, sizes, mass)
+    :return: a dict of {sizes: (probability, mass)}, with the mass of states that share sizes averaged by probability
+    """
+    merged = {}
+    for probability, sizes, mass in states:
+        if sizes in merged:
+            total, total_mass = merged[sizes]
+            merged[sizes] = (total + probability, total_mass + probability * mass)
+        else:
+            merged[sizes] = (probability, probability * mass)
+    return {sizes: (probability, mass / probability) for sizes, (probability, mass) in merged.items()}
+
+
+def solve_tournament(n_decks, matchups, n_rounds) -> dict:
+    """
+    the analytic (mean-field) odds of every record in a Swiss tournament, exact only with no pairing edges and a
+    constant win rate, see the top of the file
+    :param n_decks: a dict of decks and counts, must add up to an even number of players
+    :param matchups: a dict of deck edges or a matrix of game win rates, see swiss_sim.make_game_odds
+    :param n_rounds: rounds of Swiss
+    :return: a dict of the deck 'names', the 'counts' of each deck, and the final 'states', {sizes: (probability,
+    mass)} with mass[deck, wins] the expected players from that deck on that many wins
+    """
+    names, decks = make_field(n_decks)
+    counts = np.bincount(decks, minlength=len(names)).astype(float)
+    set_odds = set_win_odds(make_game_odds(names, matchups))
+    states = {(len(decks),): (1.0, counts[:, None])}
+    for _ in range(n_rounds):
+        next_states = []
+        for sizes, (probability, mass) in states.items():
+            next_states += [(probability * chance, new_sizes, new_mass)
+                            for chance, new_sizes, new_mass in play_state(sizes, mass, set_odds)]
+        states = merge_states(next_states)
+    return {'names': names, 'counts': counts, 'states': states}
+
+
+def win_histograms(solution) -> np.ndarray:
+    """
+    :param solution: the solution from solve_tournament
+    :return: an (n decks x rounds + 1) array, entry [deck, w] is the chance a player on that deck ends on w wins, like
+    swiss_sim.win_histograms
+    """
+    expected = sum(probability * mass for probability, mass in solution['states'].values())
+    return expected / solution['counts'][:, None]
+
+
+def top_cut_odds(solution, cut_size) -> np.ndarray:
+    """
+    the chance a player on each deck makes the top cut, with ties on wins broken at random
+    :param solution: the solution from solve_tournament
+    :param cut_size: how many players make the cut
+    :return: an array with an entry per deck
+    """
+    made_cut = np.zeros(len(solution['names']))
+    for sizes, (probability, mass) in solution['states'].items():
+        spots = cut_size
+        for wins in reversed(range(len(sizes))):
+            if spots <= 0:
+                break
+            if sizes[wins]:
+                share = min(spots / sizes[wins], 1)
+                made_cut += probability * share * mass[:, wins]
+                spots -= sizes[wins]
+    return made_cut / solution['counts']
@@ -0,0 +1,116 @@
+import numpy as np
+
+# Swiss pairings with no rematches. Pairing straight down the standings (1st plays 2nd, 3rd plays 4th...) pairs inside
+# the score groups and pairs the odd player out of a group down to the next one, and almost every round of almost
+# every tournament that's already legal. So pair_round pairs every trial down the standings at once, checks the whole
+# batch for rematches against the opponent history, and only hands the trials that have one to pair_standings.
+# pair_standings keeps who everyone has played as a bitset (a python int per player) and does a depth first search in
+# standings order: each unpaired player takes the highest placed player they haven't played, and if that paints us
+# into a corner we back up and try the next one. The sets of players it has already found can't be paired are
+# remembered (as bitsets too), so no dead end gets searched twice, and if there's a legal pairing it finds it
+
+NO_OPPONENT = -1
+
+
+def history_bitsets(opponents) -> list:
+    """
+    :param opponents: a (players x rounds) array of who every player has played, NO_OPPONENT for a round they didn't
+    :return: a list of ints, bit j of entry i is set if player i has played player j
+    """
+    bitsets = []
+    for row in opponents.tolist():
+        bits = 0
+        for opponent in row:
+            if opponent != NO_OPPONENT:
+                bits |= 1 << opponent
+        bitsets.append(bits)
+    return bitsets
+
+
+def next_opponent(players, history, remaining, first, start) -> int:
+    """
+    :param players: the players in standings order
+    :param history: a list of history bitsets, see history_bitsets
+    :param remaining: a bitset of the standings positions still to pair
+    :param first: the position we're finding an opponent for
+    :param start: the first position to look at
+    :return: the first position from start on that's still unpaired and hasn't played first, or None
+    """
+    played = history[players[first]]
+    candidates = remaining >> start
+    while candidates:
+        lowest = candidates & -candidates
+        position = start + lowest.bit_length() - 1
+        if not played >> players[position] & 1:
+            return position
+        candidates ^= lowest
+    return None
+
+
+def pair_standings(players, history, start=0) -> list:
+    """
+    pair a list of players with no rematches, each player taking the highest placed opponent that still lets
+    everyone below them get paired
+    :param players: the player numbers, in standings order. An even number of them
+    :param history: a list of history bitsets, see history_bitsets
+    :param start: the standings position to start pairing from, everyone above it is left out
+    :return: a list of (position, position) pairs in the standings, or None if every pairing has a rematch
+    """
+    remaining = ((1 << len(players)) - 1) >> start << start
+    failed = set()  # bitsets of remaining players we know can't be paired
+    stack = []
+    search_from = None
+    while remaining:
+        first = (remaining & -remaining).bit_length() - 1
+        second = next_opponent(players, history, remaining, first, first + 1 if search_from is None else search_from)
+        while second is not None and remaining ^ (1 << first) ^ (1 << second) in failed:
+            second = next_opponent(players, history, remaining, first, second + 1)
+        if second is not None:
+            stack.append((first, second))
+            remaining ^= (1 << first) | (1 << second)
+            search_from = None
+            continue
+        # nobody left works for first, so whoever paired before them has to try someone else
+        failed.add(remaining)
+        if not stack:
+            return None
+        first, second = stack.pop()
+        remaining |= (1 << first) | (1 << second)
+        search_from = second + 1
+    return stack
+
+
+def repair_trial(order, opponents, first_rematch) -> np.ndarray:
+    """
+    re-pair one trial that had a rematch when paired straight down the standings
+    :param order: the standings, an array of player numbers
+    :param opponents: a (players x rounds) array of who everyone has played
+    :param first_rematch: the standings position of the first pairing with a rematch in it
+    :return: a (players / 2 x 2) array of pairings
+    """
+    players = order.tolist()
+    history = history_bitsets(opponents)
+    pairs = pair_standings(players, history, first_rematch)
+    if pairs is not None:  # everyone above the rematch can keep their pairing
+        pairs = [(i, i + 1) for i in range(0, first_rematch, 2)] + pairs
+    else:
+        pairs = pair_standings(players, history)
+    if pairs is None:  # there's no way round a rematch, so go with the standings
+        return order.reshape(-1, 2)
+    return order[np.array(pairs)]
+
+
+def pair_round(order, opponents) -> np.ndarray:
+    """
+    pair every trial in a batch, with no rematches wherever that's possible
+    :param order: a (trials x players) array of the standings, best first. An even number of players
+    :param opponents: a (trials x players x rounds) array of who everyone has played, NO_OPPONENT for rounds to come
+    :return: a (trials x players / 2 x 2) array of pairings
+    """
+    pairs = order.reshape(len(order), -1, 2).copy()
+    rows = np.arange(len(order))[:, None]
+    rematches = (opponents[rows, pairs[..., 0]] == pairs[..., 1:]).any(axis=-1)
+    for trial in np.flatnonzero(rematches.any(axis=1)):
+        first_rematch = 2 * int(np.argmax(rematches[trial]))
+        pairs[trial] = repair_trial(order[trial], opponents[trial], first_rematch)
+    return pairs
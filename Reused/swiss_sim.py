@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+
+from Reused import binomial_batch, streaming_stats
+from Reused.parallel_runner import chunk_sizes, make_seed
+
+# a batch version of the Swiss tournament in Episode 12/Tourney_MC.py, that plays thousands of tournaments at once.
+# Every tournament has the same field, so a player is a column: records are (tournaments x players) arrays, the win
+# groups come from sorting every tournament's players by wins (with a random number to shuffle each group), and the
+# games for a whole round of every tournament are rolled in one go. Pairing down the sorted order pairs inside the win
+# groups, and the odd player out of a group plays someone from the group below, the same as Tourney_MC.play_round.
+# How the decks match up is an (n decks x n decks) matrix of game win rates, so rock-paper-scissors metagames work as
+# well as Tourney_MC's one edge per deck, and every set in a round is one random number against the set win odds
+
+N_TOURNEYS = 10000
+CHUNK_TOURNEYS = 10000  # tournaments to hold in memory at once when streaming
+
+
+def make_field(n_decks) -> tuple:
+    """
+    :param n_decks: a dict of decks and counts, like so {"Boba": N, "Kiki": M}
+    :return: (a list of the deck names, an int array of which deck every player is on, as an index into the names)
+    """
+    names = list(n_decks)
+    decks = np.repeat(np.arange(len(names)), [n_decks[name] for name in names])
+    return names, decks
+
+
+def make_edges(names, deck_edges) -> np.ndarray:
+    """
+    :param names: a list of deck names, from make_field
+    :param deck_edges: a dict of deck names and edges, any deck that isn't in it has an edge of 0
+    :return: an array of every deck's edge
+    """
+    return np.array([deck_edges.get(name, 0) for name in names], dtype=float)
+
+
+def edge_matrix(edges) -> np.ndarray:
+    """
+    the game win rates for Tourney_MC's edges: an edge of .1 against an edge of 0 wins 60% of games
+    :param edges: an array of every deck's edge
+    :return: an (n decks x n decks) array, entry [i, j] is the chance deck i wins a game against deck j
+    """
+    edges = np.asarray(edges, dtype=float)
+    return .5 + edges[:, None] - edges[None, :]
+
+
+def load_matchup_matrix(path, names) -> np.ndarray:
+    """
+    read game win rates from a csv, with the deck names across the top and down the side. Entry [row, column] is the
+    chance the row's deck wins a game against the column's
+    :param path: the csv file
+    :param names: the deck names, in the order we want the matrix in
+    :return: an (n decks x n decks) array of game win rates
+    """
+    table = pd.read_csv(path, index_col=0)
+    missing = (set(names) - set(table.index)) | (set(names) - set(table.columns))
+    if missing:
+        raise ValueError(f"{path} doesn't have a row and column for {sorted(missing)}")
+    matrix = table.loc[names, names].to_numpy(dtype=float)
+    if not np.allclose(matrix + matrix.T, 1):
+        raise ValueError(f"{path} isn't consistent, i beating j and j beating i have to add up to 1 for every pair")
+    return matrix
+
+
+def set_win_odds(game_odds) -> np.ndarray:
+    """
+    the chance of winning a best of 3, when each game is won with game_odds: win the first 2, or split them and win
+    the third, p^2 + 2p^2(1-p) = p^2(3 - 2p)
+    """
+    return game_odds ** 2 * (3 - 2 * game_odds)
+
+
+def pairing_order(wins, rng) -> np.ndarray:
+    """
+    sort every tournament's players by wins, in a random order inside each win group
+    :param wins: a (tournaments x players) array of match wins
+    :param rng: a numpy Generator
+    :return: a (tournaments x players) array of player indexes, best record first. Players 0 and 1 play each other,
+    then 2 and 3, and so on
+    """
+    return np.lexsort((rng.random(wins.shape), -wins), axis=-1)
+
+
+def play_round(wins, losses, decks, set_odds, rng) -> None:
+    """
+    pair and play one round of every tournament, no byes, drops or ties
+    :param wins: a (tournaments x players) array of match wins, updated in place
+    :param losses: a (tournaments x players) array of match losses, updated in place
+    :param decks: a (players,) array of which deck every player is on
+    :param set_odds: an (n decks x n decks) array of set win rates, see set_win_odds
+    :param rng: a numpy Generator
+    """
+    order = pairing_order(wins, rng)
+    player1, player2 = order[:, 0::2], order[:, 1::2]
+    player1_wins = rng.random(player1.shape) < set_odds[decks[player1], decks[player2]]
+    rows = np.arange(len(wins))[:, None]
+    winners = np.where(player1_wins, player1, player2)
+    losers = np.where(player1_wins, player2, player1)
+    wins[rows, winners] += 1
+    losses[rows, losers] += 1
+
+
+def make_game_odds(names, matchups) -> np.ndarray:
+    """
+    :param names: a list of deck names, from make_field
+    :param matchups: a dict of deck names and edges (see Tourney_MC.play_game), or an (n decks x n decks) array of
+    game win rates in the same order as names
+    :return: an (n decks x n decks) array of game win rates
+    """
+    if isinstance(matchups, dict):
+        return edge_matrix(make_edges(names, matchups))
+    return np.asarray(matchups, dtype=float)
+
+
+def run_tournaments(n_decks, matchups, n_rounds, n_tourneys=N_TOURNEYS, seed=None) -> dict:
+    """
+    play n_tourneys Swiss tournaments with the same field
+    :param n_decks: a dict of decks and counts, must add up to an even number of players
+    :param matchups: a dict of deck edges or a matrix of game win rates, see make_game_odds
+    :param n_rounds: rounds of Swiss
+    :param n_tourneys: how many tournaments to play
+    :param seed: an int, SeedSequence or None
+    :return: a dict of the deck 'names', every player's 'decks' index, 'n_rounds', and (tournaments x players) arrays
+    of 'wins' and 'losses'
+    """
+    names, decks = make_field(n_decks)
+    if len(decks) % 2:
+        raise ValueError(f"{len(decks)} players, we need an even number because there are no byes")
+    rng = np.random.default_rng(seed)
+    set_odds = set_win_odds(make_game_odds(names, matchups))
+    wins = np.zeros((n_tourneys, len(decks)), dtype=np.int32)
+    losses = np.zeros_like(wins)
+    for _ in range(n_rounds):
+        play_round(wins, losses, decks, set_odds, rng)
+    return {'names': names, 'decks': decks, 'n_rounds': n_rounds, 'wins': wins, 'losses': losses}
+
+
+def win_counts(results) -> np.ndarray:
+    """
+    :param results: the results from run_tournaments
+    :return: an (n decks x rounds + 1) array, entry [deck, w] is how many players on that deck ended on w wins
+    """
+    n_names, n_records = len(results['names']), results['n_rounds'] + 1
+    cells = results['decks'] * n_records + results['wins']  # one bincount over every (deck, wins) pair
+    return np.bincount(cells.ravel(), minlength=n_names * n_records).reshape(n_names, n_records)
+
+
+def win_histograms(results) -> np.ndarray:
+    """
+    :param results: the results from run_tournaments
+    :return: an (n decks x rounds + 1) array, entry [deck, w] is the chance a player on that deck ends on w wins
+    """
+    counts = win_counts(results)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+
+def deck_records(results) -> tuple:
+    """
+    :param results: the results from run_tournaments
+    :return: (wins, played), (tournaments x n decks) arrays of every deck's match wins and matches in every tournament
+    """
+    n_names = len(results['names'])
+    wins = np.zeros((len(results['wins']), n_names), dtype=np.int64)
+    played = np.zeros_like(wins)
+    for deck in range(n_names):
+        on_deck = results['decks'] == deck
+        wins[:, deck] = results['wins'][:, on_deck].sum(axis=1)
+        played[:, deck] = wins[:, deck] + results['losses'][:, on_deck].sum(axis=1)
+    return wins, played
+
+
+def deck_win_rates(results) -> np.ndarray:
+    """
+    :param results: the results from run_tournaments
+    :return: a (tournaments x n decks) array of every deck's match win rate in every tournament
+    """
+    wins, played = deck_records(results)
+    return wins / played
+
+
+def top_cut_odds(results, cut_size, seed=None) -> np.ndarray:
+    """
+    :param results: the results from run_tournaments
+    :param cut_size: how many players make the cut, ties on wins are broken at random
+    :param seed: an int, SeedSequence or None, for breaking the ties
+    :return: an array of the chance a player on each deck makes the cut
+    """
+    cut = pairing_order(results['wins'], np.random.default_rng(seed))[:, :cut_size]
+    made_cut = np.bincount(results['decks'][cut].ravel(), minlength=len(results['names']))
+    counts = np.bincount(results['decks'], minlength=len(results['names']))
+    return made_cut / (counts * len(results['wins']))
+
+
+def stream_tournaments(n_decks, matchups, n_rounds, n_tourneys=N_TOURNEYS, seed=None, cut_size=8) -> dict:
+    """
+    run_tournaments in chunks of CHUNK_TOURNEYS, keeping fixed size summaries of each chunk instead of every record,
+    so memory stays the same for a thousand tournaments or ten million
+    :param n_decks: a dict of decks and counts, must add up to an even number of players
+    :param matchups: a dict of deck edges or a matrix of game win rates, see make_game_odds
+    :param n_rounds: rounds of Swiss
+    :param n_tourneys: how many tournaments to play
+    :param seed: an int, SeedSequence or None
+    :param cut_size: how many players make the top cut
+    :return: a dict of the deck 'names', 'n_rounds', the 'histograms' from win_histograms, the 'top_cut' odds from
+    top_cut_odds, 'win_rates', a streaming_stats accumulator per deck of its match win rate in each tournament, and
+    'flagged', the share of tournaments where a deck's match record fails the Binomial Calculator's two-sided
+    coinflip test (binomial_batch.binom_tests, corrected for testing every deck in the tournament), so decks doing
+    significantly worse than a coinflip count as well as decks doing better
+    """
+    seed = make_seed(seed)
+    names = list(n_decks)
+    counts = np.zeros((len(names), n_rounds + 1), dtype=np.int64)
+    made_cut = np.zeros(len(names))
+    flagged = np.zeros(len(names), dtype=np.int64)
+    win_rates = [streaming_stats.make_accumulator(0, 1) for _ in names]
+    for chunk, size in enumerate(chunk_sizes(n_tourneys, CHUNK_TOURNEYS)):
+        results = run_tournaments(n_decks, matchups, n_rounds, size, make_seed(seed, chunk))
+        counts += win_counts(results)
+        made_cut += top_cut_odds(results, cut_size, make_seed(seed, chunk, 1)) * size
+        wins, played = deck_records(results)
+        flagged += binomial_batch.binom_tests(wins, played)['reject'].sum(axis=0)
+        for accumulator, rates in zip(win_rates, (wins / played).T):
+            streaming_stats.add_samples(accumulator, rates)
+    return {'names': names, 'n_rounds': n_rounds, 'histograms': counts / counts.sum(axis=1, keepdims=True),
+            'top_cut': made_cut / n_tourneys, 'win_rates': win_rates, 'flagged': flagged / n_tourneys}
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+
+from Reused.adaptive_mc import make_estimate
+
+# "how many copies do I need to hit X% of the time?" More copies never hurts, so the odds only go up with the copy
+# count, and we can bisect for the first count over the target instead of working out every count from 1 to 30.
+# bisect_min is for exact evaluators, bisect_grid does a whole grid of (deck size, horizon, target...) cells at once
+# with a handful of broadcast calls, and noisy_bisect is for Monte Carlo evaluators, where every step keeps running
+# trials until the confidence interval says which side of the target we're on
+
+ALPHA = .05  # the chance of a noisy search taking a wrong turn anywhere along the way
+BATCH_TRIALS = 2000  # trials per batch at each noisy step
+MAX_STEP_TRIALS = 100000  # give up on the interval and go with the point estimate after this many trials at one count
+
+
+def bisect_min(evaluate, target, low, high) -> tuple:
+    """
+    find the smallest count whose odds are over target, for an evaluator that only goes up with the count
+    :param evaluate: a function of the count, giving the odds
+    :param target: the odds we need to beat
+    :param low: the smallest count to consider
+    :param high: the biggest count to consider
+    :return: (the smallest count in [low, high] with evaluate(count) > target or None if there isn't one,
+    the number of times we called evaluate)
+    """
+    n_evaluations = 0
+    answer = None
+    while low <= high:
+        middle = (low + high) // 2
+        n_evaluations += 1
+        if evaluate(middle) > target:
+            answer = middle
+            high = middle - 1
+        else:
+            low = middle + 1
+    return answer, n_evaluations
+
+
+def bisect_grid(evaluate, target, low, high) -> np.ndarray:
+    """
+    bisect_min for every cell of a grid at once
+    :param evaluate: a function that takes an array of counts and gives back an array of odds of the same shape, e.g.
+    lambda copies: 1 - hypergeo_grid.cdf(0, deck_sizes, copies, seen), with deck_sizes and seen broadcast to the grid
+    :param target: the odds to beat, a number or an array that broadcasts against the grid
+    :param low: the smallest count to consider
+    :param high: the biggest count to consider
+    :return: an int array, the smallest count over target for every cell, or high + 1 where there isn't one
+    """
+    shape = np.shape(evaluate(np.full((), low)) > target)
+    lows = np.full(shape, low)
+    highs = np.full(shape, high + 1)  # high + 1 stands for "none of them"
+    while (lows < highs).any():
+        middles = (lows + highs) // 2
+        over = evaluate(np.minimum(middles, high)) > target
+        searching = lows < highs
+        highs = np.where(searching & over, middles, highs)
+        lows = np.where(searching & ~over, middles + 1, lows)
+    return lows
+
+
+def noisy_bisect(sample, target, low, high, alpha=ALPHA, batch_trials=BATCH_TRIALS, max_step_trials=MAX_STEP_TRIALS,
+                 method='wilson') -> tuple:
+    """
+    bisect_min for a Monte Carlo evaluator. At each count we keep running batches of trials until the confidence
+    interval is all above or all below target, or until max_step_trials
+    :param sample: a function of (count, n_trials) that runs n_trials and gives back the number of hits
+    :param target: the hit rate we need to beat
+    :param low: the smallest count to consider
+    :param high: the biggest count to consider
+    :param alpha: the chance of the whole search taking a wrong turn, split over its steps and the looks at each step
+    :param batch_trials: trials per batch
+    :param max_step_trials: the most trials to run at one count
+    :param method: the proportion_confint method
+    :return: (the smallest count over target or None, a dict of {count: estimate} for every count we looked at)
+    """
+    # Bonferroni over the steps of the bisection, and over every look we might take at one step, since we stop at the
+    # first look where the interval clears the target
+    n_steps = max(math.ceil(math.log2(high - low + 2)), 1)
+    n_looks = max(math.ceil(max_step_trials / batch_trials), 1)
+    step_alpha = alpha / (n_steps * n_looks)
+    estimates = {}
+    answer = None
+    while low <= high:
+        middle = (low + high) // 2
+        successes, n_trials = 0, 0
+        while True:
+            if n_trials:
+                estimate = make_estimate(successes, n_trials, step_alpha, method)
+                interval_low, interval_high = estimate['interval']
+                if interval_low > target or interval_high <= target or n_trials >= max_step_trials:
+                    break
+            successes += sample(middle, batch_trials)
+            n_trials += batch_trials
+        estimates[middle] = estimate
+        if estimate['rate'] > target:
+            answer = middle
+            high = middle - 1
+        else:
+            low = middle + 1
+    return answer, estimates
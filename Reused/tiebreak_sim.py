@@ -0,0 +1,226 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from Reused import streaming_stats, swiss_pairing
+from Reused.parallel_runner import chunk_sizes, make_seed, map_jobs
+
+# the engine behind Episode 32/Tiebreak Simulator.py, which asks how much it matters *when* our hero takes their one
+# loss. Player 0 is the special player: they lose every game in magic_round and (with perfect_record) win every other
+# game, everyone else flips coins.
+# Rather than Player objects, the state is a dict of (trials x players) arrays, so every trial's round is played at
+# once. Each player's match and game totals are kept up to date as matches are recorded, and the opponents they've
+# played go in a (trials x players x rounds) array, so the opponent percentages come from one gather instead of walking
+# opponent lists. Standings are one lexsort over the tiebreak columns.
+# sweep runs a grid of scenarios (the losing round, field size, rounds and perfect_record) through a process pool. Like
+# parallel_runner, every scenario is cut into chunks of trials, and every chunk's random stream comes from the seed and
+# the scenario's own settings, so the answers don't depend on the number of workers or what else is in the grid
+
+N_PLAYERS = 128
+N_ROUNDS = 7
+SPECIAL = 0  # the special player's number
+NO_OPPONENT = swiss_pairing.NO_OPPONENT
+CHUNK_TRIALS = 1000  # trials per chunk of a sweep
+TOP_CUT = 8
+
+
+def make_state(n_trials, n_players=N_PLAYERS, n_rounds=N_ROUNDS) -> dict:
+    """
+    :return: a blank tournament state for n_trials tournaments of n_players, listed in player number order
+    """
+    shape = (n_trials, n_players)
+    return {'match_wins': np.zeros(shape, dtype=np.int32),
+            'matches_played': np.zeros(shape, dtype=np.int32),
+            'game_wins': np.zeros(shape, dtype=np.int32),
+            'games_played': np.zeros(shape, dtype=np.int32),
+            'opponents': np.full(shape + (n_rounds,), NO_OPPONENT, dtype=np.int32),
+            'order': np.broadcast_to(np.arange(n_players), shape).copy(),  # the current standings, best first
+            'round': 0}
+
+
+def opponent_average(state, values) -> np.ndarray:
+    """
+    the average of some per-player value over every player's opponents so far
+    :param state: a tournament state
+    :param values: a (trials x players) array
+    :return: a (trials x players) array
+    """
+    opponents = state['opponents'][..., :state['round']]
+    if not state['round']:
+        return np.zeros(values.shape)
+    return np.take_along_axis(values, opponents.reshape(len(values), -1), axis=1).reshape(opponents.shape).mean(axis=-1)
+
+
+def tiebreak_columns(state) -> list:
+    """
+    the tiebreakers, in order: match wins > opponents' match win % > game win % > opponents' game win %
+    :return: a list of (trials x players) arrays
+    """
+    played = np.maximum(state['matches_played'], 1)
+    games = np.maximum(state['games_played'], 1)
+    match_win_percent = state['match_wins'] / played
+    game_win_percent = state['game_wins'] / games
+    return [state['match_wins'], opponent_average(state, match_win_percent), game_win_percent,
+            opponent_average(state, game_win_percent)]
+
+
+def sort_standings(state) -> None:
+    """
+    re-rank every trial by the tiebreakers, best first. Players who tie on all of them keep their order from the last
+    standings, like a stable sort
+    """
+    order = state['order']
+    columns = [np.take_along_axis(column, order, axis=1) for column in tiebreak_columns(state)]
+    # lexsort sorts by its last key first, and it's stable
+    ranks = np.lexsort([-column for column in reversed(columns)], axis=-1)
+    state['order'] = np.take_along_axis(order, ranks, axis=1)
+
+
+def do_pairings(state) -> np.ndarray:
+    """
+    pair every trial down the standings with no rematches, see swiss_pairing
+    :return: a (trials x players / 2 x 2) array of every trial's pairings
+    """
+    return swiss_pairing.pair_round(state['order'], state['opponents'])
+
+
+def play_games(pairs, state, rng, magic_round, perfect_record) -> np.ndarray:
+    """
+    roll up to 3 games for every pairing, a coin flip each unless the special player is in it
+    :param pairs: pairings from do_pairings
+    :return: a (trials x pairs x 3) bool array, True where player 1 won the game
+    """
+    wins = rng.random(pairs.shape[:2] + (3,)) <= .5
+    if magic_round == state['round'] + 1:
+        special_wins = False
+    elif perfect_record:
+        special_wins = True
+    else:
+        return wins
+    wins[pairs[..., 0] == SPECIAL] = special_wins
+    wins[pairs[..., 1] == SPECIAL] = not special_wins
+    return wins
+
+
+def record_matches(state, pairs, games) -> None:
+    """
+    play out the best of 3s and add the results to everyone's totals
+    :param pairs: pairings from do_pairings
+    :param games: game results from play_games
+    """
+    first_two = games[..., 0].astype(np.int32) + games[..., 1]
+    third = first_two == 1  # we only play game 3 after a 1-1
+    player1_games = first_two + (third & games[..., 2])
+    n_games = 2 + third
+    player1_won = player1_games >= 2
+    rows = np.arange(len(pairs))[:, None]
+    for player, opponent, game_wins, won in ((pairs[..., 0], pairs[..., 1], player1_games, player1_won),
+                                             (pairs[..., 1], pairs[..., 0], n_games - player1_games, ~player1_won)):
+        state['opponents'][rows, player, state['round']] = opponent
+        state['matches_played'][rows, player] += 1
+        state['match_wins'][rows, player] += won
+        state['games_played'][rows, player] += n_games
+        state['game_wins'][rows, player] += game_wins
+    state['round'] += 1
+
+
+def play_tournament_round(state, rng, magic_round, perfect_record) -> None:
+    pairs = do_pairings(state)
+    record_matches(state, pairs, play_games(pairs, state, rng, magic_round, perfect_record))
+    sort_standings(state)
+
+
+def special_positions(n_trials, magic_round, perfect_record=True, n_players=N_PLAYERS, n_rounds=N_ROUNDS,
+                      seed=None) -> np.ndarray:
+    """
+    :param n_trials: how many tournaments to play
+    :param magic_round: the round the special player loses, counting from 1
+    :param perfect_record: whether the special player wins every other game, or flips coins like everyone else
+    :param n_players: players in each tournament
+    :param n_rounds: rounds of Swiss
+    :param seed: an int, SeedSequence or None
+    :return: an array of where the special player finished in every trial, 0 being first
+    """
+    rng = np.random.default_rng(seed)
+    state = make_state(n_trials, n_players, n_rounds)
+    for _ in range(n_rounds):
+        play_tournament_round(state, rng, magic_round, perfect_record)
+    return np.argmax(state['order'] == SPECIAL, axis=1)
+
+
+def make_scenarios(magic_rounds, field_sizes=(N_PLAYERS,), round_counts=(N_ROUNDS,), perfect_records=(True,)) -> list:
+    """
+    every combination of the settings, skipping losing rounds past the end of the tournament
+    :return: a list of scenario dicts, with 'magic_round', 'n_players', 'n_rounds' and 'perfect_record'
+    """
+    return [{'magic_round': magic_round, 'n_players': n_players, 'n_rounds': n_rounds,
+             'perfect_record': perfect_record}
+            for magic_round, n_players, n_rounds, perfect_record in
+            itertools.product(magic_rounds, field_sizes, round_counts, perfect_records) if magic_round <= n_rounds]
+
+
+def scenario_key(scenario) -> tuple:
+    return (scenario['magic_round'], scenario['n_players'], scenario['n_rounds'], int(scenario['perfect_record']))
+
+
+def position_accumulator(n_players) -> dict:
+    """
+    :return: an empty streaming_stats accumulator with a bin for every finishing position
+    """
+    return streaming_stats.make_accumulator(-.5, n_players - .5, n_players)
+
+
+def run_chunk(job) -> dict:
+    """
+    play one chunk of a scenario
+    :param job: a tuple of (seed_sequence, n_trials, scenario)
+    :return: a streaming_stats accumulator of where the special player finished
+    """
+    seed_sequence, n_trials, scenario = job
+    positions = special_positions(n_trials, scenario['magic_round'], scenario['perfect_record'],
+                                  scenario['n_players'], scenario['n_rounds'], seed_sequence)
+    return streaming_stats.add_samples(position_accumulator(scenario['n_players']), positions)
+
+
+def sweep_positions(scenarios, n_trials, seed=None, n_workers=1, executor=None) -> list:
+    """
+    play every scenario
+    :param scenarios: a list of scenario dicts, see make_scenarios
+    :param n_trials: trials per scenario
+    :param seed: an int or SeedSequence, fix it to get the same answer back whatever n_workers is
+    :param n_workers: how many processes to use, 1 runs everything here
+    :param executor: an already running ProcessPoolExecutor to use instead of making a new one
+    :return: a list with a streaming_stats accumulator per scenario, of where the special player finished. Only the
+    accumulators come back from the workers, so memory doesn't grow with n_trials
+    """
+    seed = make_seed(seed)
+    jobs = []
+    for scenario in scenarios:
+        jobs += [(make_seed(seed, *scenario_key(scenario), chunk), size, scenario)
+                 for chunk, size in enumerate(chunk_sizes(n_trials, CHUNK_TRIALS))]
+    results = map_jobs(run_chunk, jobs, n_workers, executor)
+    n_chunks = len(chunk_sizes(n_trials, CHUNK_TRIALS))
+    return [streaming_stats.merge_all(results[i:i + n_chunks]) for i in range(0, len(results), n_chunks)]
+
+
+def results_table(scenarios, positions) -> pd.DataFrame:
+    """
+    :param scenarios: a list of scenario dicts
+    :param positions: the matching list of position accumulators, from sweep_positions
+    :return: a table with a row per scenario, its settings and where the special player finished
+    """
+    rows = []
+    for scenario, accumulator in zip(scenarios, positions):
+        stats = streaming_stats.summary(accumulator, (.5,))
+        top_cut = accumulator['counts'][:TOP_CUT].sum() / accumulator['n']
+        rows.append({**scenario, 'n_trials': stats['n'], 'mean_position': stats['mean'], 'std_position': stats['std'],
+                     'median_position': stats['q0.5'], f'top_{TOP_CUT}': top_cut})
+    return pd.DataFrame(rows)
+
+
+def sweep(scenarios, n_trials, seed=None, n_workers=1, executor=None) -> pd.DataFrame:
+    """
+    sweep_positions, summed up as a results_table
+    """
+    return results_table(scenarios, sweep_positions(scenarios, n_trials, seed, n_workers, executor))
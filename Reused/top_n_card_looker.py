@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
-from numpy.ma.extras import average
-from scipy.stats import hypergeom
+import numpy as np
+
+from Reused import hypergeo_grid
 
 
 # we're using this to calculate number of matching cards you need if you're
@@ -14,23 +15,21 @@ N_CARDS = 2
 
 
 
-def get_draw_odds(draws, n_copies, n_cards) -> float:
+def get_draw_odds(draws, n_copies, n_cards, deck_size=STARTING_DECK_SIZE) -> float:
     """
     get the hypergeometric odds of NOT drawing at least n_cards copy of a card from the top draws cards
     :param draws: the number of cards you're looking at from the top of the deck
     :param n_copies: the number of copies of the card in the deck
     :param n_cards: the number of cards for MAX VALUE
+    :param deck_size: the number of cards in the deck
     :return: the hypergeometric odds of drawing at least one of the copies of the card
     """
-    prob_miss = hypergeom.cdf(n_cards -1, STARTING_DECK_SIZE, n_copies, draws)
+    prob_miss = hypergeo_grid.cdf(n_cards -1, deck_size, n_copies, draws)
     return prob_miss
 
-def get_average_number_of_cards(draws, n_copies, max_cards):
-    average_cards = 0
-    for cards in range(max_cards+1):
-        average_cards += cards*hypergeom.pmf(cards, STARTING_DECK_SIZE, n_copies, draws)
-    average_cards += max_cards*(1-hypergeom.cdf(max_cards, STARTING_DECK_SIZE, n_copies, draws))
-    return average_cards
+def get_average_number_of_cards(draws, n_copies, max_cards, deck_size=STARTING_DECK_SIZE):
+    # every copy past max_cards is wasted, so this is the average of min(copies seen, max_cards)
+    return hypergeo_grid.expected_capped(max_cards, deck_size, n_copies, draws)
 
 def make_odds_plot(results) -> None:
     """
@@ -66,19 +65,18 @@ def make_average_cards_plot(results):
     plt.show()
 
 
-success_rate = []
-average_cards = []
-for copies in range(1, 30):
-    hit_rate = 1-get_draw_odds(draws = LOOKS, n_copies=copies, n_cards=N_CARDS)
-    c = get_average_number_of_cards(draws=LOOKS, n_copies=copies, max_cards=N_CARDS)
-    # need to miss on both initial hand and mulligan, so we want to calculate the odds of missing twice and taking
-    # the conjugate probability
-    success_rate.append(hit_rate)
-    average_cards.append(c)
-    if hit_rate > .95:  # we're assuming we want a 95% or greater hit rate
-        pass
-        # print(f"copies: {copies}, max_hit_rate: {hit_rate}")
-    if c > 1:
-        print(f"copies: {copies}, average_cards_drawn: {c}")
-make_odds_plot(success_rate)
-make_average_cards_plot(average_cards)
+if __name__ == "__main__":
+    copy_range = np.arange(1, 30)
+    # every copy count at once
+    success_rate = 1-get_draw_odds(draws = LOOKS, n_copies=copy_range, n_cards=N_CARDS)
+    average_cards = get_average_number_of_cards(draws=LOOKS, n_copies=copy_range, max_cards=N_CARDS)
+    for copies, hit_rate, c in zip(copy_range, success_rate, average_cards):
+        # need to miss on both initial hand and mulligan, so we want to calculate the odds of missing twice and taking
+        # the conjugate probability
+        if hit_rate > .95:  # we're assuming we want a 95% or greater hit rate
+            pass
+            # print(f"copies: {copies}, max_hit_rate: {hit_rate}")
+        if c > 1:
+            print(f"copies: {copies}, average_cards_drawn: {c}")
+    make_odds_plot(success_rate)
+    make_average_cards_plot(average_cards)
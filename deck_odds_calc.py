@@ -1,5 +1,7 @@
 import matplotlib.pyplot as plt
-from scipy.stats import hypergeom
+import numpy as np
+
+from Reused import hypergeo_grid
 
 sample_low_curve = {0: 0, 1: 10, 2: 15, 3: 12, 4: 10, 5: 3}
 sample_flat_curve = {0: 0, 1: 7, 2: 7, 3: 7, 4: 7, 5: 7, 6: 7, 7: 7, 8: 1}
@@ -11,24 +13,19 @@ cards_seen_on_turn = [6+2*(i-1) for i in range(15)]
 distros = {'low_curve': sample_low_curve, 'flat_curve': sample_flat_curve, "high_curve": sample_high_curve}
 
 
-def get_prob_on_turn(turn_number: int, distro: dict) -> float:
-    cards_seen = cards_seen_on_turn[turn_number]
-    prob = hypergeom.cdf(0, 50, distro[turn_number+1], cards_seen)
+def get_prob_on_turn(turn_number, distro: dict):
+    """
+    :param turn_number: a turn, or an array of turns to do at once
+    :param distro: a dict of cost: copies, a cost we have no cards at just has no chance
+    :return: the chance of having a turn_number + 1 cost play on turn_number
+    """
+    turn_number = np.asarray(turn_number)
+    cards_seen = np.array(cards_seen_on_turn)[turn_number]
+    copies = np.vectorize(lambda turn: distro.get(turn + 1, 0))(turn_number)
+    prob = hypergeo_grid.cdf(0, 50, copies, cards_seen)
     return 1-prob
 
 
-prob_mass = {}
-for distro in distros:
-    print(f"{distro} sum : {sum(distros[distro].values())}")
-    prob_mass[distro] = []
-    for turn in range(1, 10):
-        try:
-            prob = get_prob_on_turn(turn, distros[distro])
-        except KeyError:
-            prob = 0
-        prob_mass[distro].append(prob)
-
-
 def make_plot(distros):
     with plt.xkcd():
         fig = plt.figure()
@@ -47,4 +44,10 @@ def make_plot(distros):
     plt.show()
 
 
-make_plot(prob_mass)
+if __name__ == "__main__":
+    prob_mass = {}
+    turns = np.arange(1, 10)
+    for distro in distros:
+        print(f"{distro} sum : {sum(distros[distro].values())}")
+        prob_mass[distro] = get_prob_on_turn(turns, distros[distro])  # every turn at once
+    make_plot(prob_mass)